@@ -12,6 +12,9 @@ const CustomRequests = {
   RestartCheckpoint: "restart-checkpoint",
   DeleteCheckpoint: "delete-checkpoint",
   ClearCheckpoints: "clear-checkpoints",
+  WatchCacheStats: "watch-cache-stats",
+  VariablesBatch: "variablesBatch",
+  LatencyHistograms: "latency-histograms",
 };
 
 // Custom requests that doesn't reach the backend, whether it is gdb or mdb
@@ -42,9 +42,10 @@ class DebuggerProcessBase {
    * Exec the debugger application at `path` with `args`
    * @param { string } path - path to the debugger (gdb, mdb. path to rr is handled elsewhere.)
    * @param { string[] } args - command line arguments for the debuggers
+   * @param { Object.<string, string> } [env] - environment variables, in addition to the extension host's
    */
-  spawnDebugger(path, args) {
-    this.#process = spawn(path, args);
+  spawnDebugger(path, args, env) {
+    this.#process = spawn(path, args, { env: { ...process.env, ...(env ?? {}) } });
   }
 
   /**
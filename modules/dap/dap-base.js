@@ -35,6 +35,28 @@ const { consoleLog, consoleErr } = require("../utils/log");
  * @typedef { import("./base-process-handle").DebuggerProcessBase } DebuggerProcessBase
  */
 
+// Requests that start, configure or move the debug session. Their failures are always shown to the user.
+const SessionLifecycleRequests = new Set([
+  "launch",
+  "attach",
+  "configurationDone",
+  "restart",
+  "continue",
+  "next",
+  "stepIn",
+  "stepOut",
+  "stepBack",
+  "reverseContinue",
+  "pause",
+  "disconnect",
+  "terminate",
+  CustomRequests.ContinueAll,
+  CustomRequests.PauseAll,
+  CustomRequests.ReverseFinish,
+  CustomRequests.RunToEvent,
+  CustomRequests.RestartCheckpoint,
+]);
+
 class MidasSessionBase extends DebugSession {
   formatValuesAsHex = false;
   /** @type { Set<number> } */
@@ -55,6 +77,29 @@ class MidasSessionBase extends DebugSession {
 
   // The currently loaded pretty printer.
   #printer;
+
+  // Nodes in the variables tree that the user had expanded during the previous stop, are pre-fetched in bulk using
+  // `variablesBatch`, as soon as their (new) variablesReference is known, instead of with one request each.
+  /** @type { Map<number, string> } - variablesReference -> path of the node in the variables tree */
+  #variablePaths = new Map();
+  /** @type { Set<string> } - paths of the nodes expanded during the previous stop */
+  #previouslyExpanded = new Set();
+  /** @type { Set<string> } - paths of the nodes expanded during the current stop */
+  #expanded = new Set();
+  /** @type { Map<number, Promise<any[] | null>> } */
+  #prefetched = new Map();
+  /** @type { Map<number, number> } - request seq -> variablesReference, of `variables` requests in flight */
+  #pendingVariables = new Map();
+  /** @type { Map<number, number> } - request seq -> frameId, of `scopes` requests in flight */
+  #pendingScopes = new Map();
+  /** @type { Map<number, { threadId: number, startFrame?: number }> } - request seq -> args, of `stackTrace` requests */
+  #pendingStackTraces = new Map();
+  /** @type { Map<number, string> } - frameId -> path of the frame; the root of the paths of its scopes */
+  #framePaths = new Map();
+  #variablesGeneration = 0;
+  // Requests made by the adapter itself use negative sequence numbers, so they never clash with VSCode's.
+  #internalSeq = 0;
+
   /**
    * @param { new (options) => DebuggerProcessBase } DebuggerProcessConstructor
    * @param { LaunchSpawnConfig | AttachSpawnConfig | RRSpawnConfig } spawnConfig
@@ -88,9 +133,24 @@ class MidasSessionBase extends DebugSession {
     } else {
       this.dbg.connectResponse((res) => {
         if (!res.success) {
-          const err = (res.body?.error ?? { stacktrace: "No stack trace info" }).stacktrace;
-          consoleErr(`request error: ${res.command} failed\n${err}`);
-          this.sendErrorResponse(res, { id: 1, format: `Communications error: ${res.message ?? "Unknown"}`, showUser: true });
+          // Expected failures of inspection requests (cancelled, stale or invalid requests, unreadable values) carry
+          // no stack trace and are not worth interrupting the user over. Failing to start, configure or step the
+          // session is, whatever the cause.
+          const stacktrace = res.body?.error?.stacktrace;
+          const showUser =
+            stacktrace != null || res.body?.error?.showUser === true || SessionLifecycleRequests.has(res.command);
+          consoleErr(`request error: ${res.command} failed: ${res.message ?? "Unknown"}`);
+          this.#pendingVariables.delete(res.request_seq);
+          this.#pendingScopes.delete(res.request_seq);
+          this.#pendingStackTraces.delete(res.request_seq);
+          if (stacktrace != null) {
+            consoleErr(stacktrace);
+          }
+          this.sendErrorResponse(res, {
+            id: 1,
+            format: `Communications error: ${res.message ?? "Unknown"}`,
+            showUser: showUser,
+          });
           return;
         }
         switch (res.command) {
@@ -101,6 +161,23 @@ class MidasSessionBase extends DebugSession {
           case "threads":
             this.UpdateThreadIdCache(res.body);
             break;
+          case "stackTrace":
+            this.registerFramePaths(this.#pendingStackTraces.get(res.request_seq), res.body?.stackFrames);
+            this.#pendingStackTraces.delete(res.request_seq);
+            break;
+          case "scopes": {
+            const frameId = this.#pendingScopes.get(res.request_seq);
+            this.#pendingScopes.delete(res.request_seq);
+            // Responses to requests made before the debuggee resumed aren't tracked anymore
+            if (frameId !== undefined) {
+              this.registerVariablePaths(null, res.body.scopes, this.#framePaths.get(frameId) ?? `/frame ${frameId}`);
+            }
+            break;
+          }
+          case "variables":
+            this.registerVariablePaths(this.#pendingVariables.get(res.request_seq), res.body.variables);
+            this.#pendingVariables.delete(res.request_seq);
+            break;
         }
         this.sendResponse(res);
       });
@@ -118,6 +195,9 @@ class MidasSessionBase extends DebugSession {
           case "exited":
             this.emit("exit");
             break;
+          case "continued":
+            this.resetVariablePaths();
+            break;
           case "startDebugging":
             // currently, only midas-native supports multiprocessing
             // via reverse requesting a debug session.
@@ -272,6 +352,7 @@ class MidasSessionBase extends DebugSession {
   }
 
   stackTraceRequest(response, args, request) {
+    this.#pendingStackTraces.set(request.seq, args);
     this.dbg.sendRequest(request, args);
   }
 
@@ -281,6 +362,26 @@ class MidasSessionBase extends DebugSession {
     }
 
     if (!this.#printer) {
+      const path = this.#variablePaths.get(args.variablesReference);
+      if (path !== undefined) {
+        this.#expanded.add(path);
+      }
+      const prefetched = this.#prefetched.get(args.variablesReference);
+      if (prefetched !== undefined && args.filter == null && args.start == null && args.count == null) {
+        // Served once; a later request for the reference asks the adapter
+        this.#prefetched.delete(args.variablesReference);
+        prefetched.then((variables) => {
+          if (variables == null) {
+            this.#pendingVariables.set(request.seq, args.variablesReference);
+            this.dbg.sendRequest(request, args);
+          } else {
+            response.body = { variables };
+            this.sendResponse(response);
+          }
+        });
+        return;
+      }
+      this.#pendingVariables.set(request.seq, args.variablesReference);
       this.dbg.sendRequest(request, args);
       return;
     }
@@ -302,6 +403,113 @@ class MidasSessionBase extends DebugSession {
     });
   }
 
+  /**
+   * Record the paths of stack frames, which are the roots of the paths of their scopes. Frames are identified by
+   * thread, level and function, which (unlike frame ids) carry over from one stop to the next.
+   * @param { { threadId: number, startFrame?: number } | undefined } args - arguments of the stackTrace request.
+   * @param { { id: number, name: string }[] | undefined } stackFrames
+   */
+  registerFramePaths(args, stackFrames) {
+    if (args === undefined || stackFrames == null) {
+      return;
+    }
+    const startFrame = args.startFrame ?? 0;
+    stackFrames.forEach(({ id, name }, index) => {
+      this.#framePaths.set(id, `/${args.threadId}/${startFrame + index}/${name}`);
+    });
+  }
+
+  /**
+   * Record the tree paths of `items` (scopes or variables) and pre-fetch the ones that were expanded during the
+   * previous stop.
+   * @param { number | null | undefined } parentReference - variablesReference of the parent node, null for scopes.
+   *  undefined if the parent isn't tracked (anymore), in which case nothing is recorded.
+   * @param { { name: string, variablesReference: number }[] } items
+   * @param { string } rootPath - path of the frame, for scopes.
+   */
+  registerVariablePaths(parentReference, items, rootPath = "") {
+    if (parentReference === undefined) {
+      return;
+    }
+    const parentPath = parentReference === null ? rootPath : this.#variablePaths.get(parentReference);
+    if (parentPath === undefined || items == null) {
+      return;
+    }
+    const references = [];
+    for (const { name, variablesReference } of items) {
+      if (variablesReference > 0) {
+        const path = `${parentPath}/${name}`;
+        this.#variablePaths.set(variablesReference, path);
+        if (this.#previouslyExpanded.has(path) && !this.#prefetched.has(variablesReference)) {
+          references.push(variablesReference);
+        }
+      }
+    }
+    if (references.length > 0) {
+      this.prefetchVariables(references);
+    }
+  }
+
+  /**
+   * Request the contents of all `references` in one `variablesBatch` round trip.
+   * @param { number[] } references
+   */
+  prefetchVariables(references) {
+    const generation = this.#variablesGeneration;
+    const format = this.formatValuesAsHex ? { hex: true } : undefined;
+    const request = { seq: --this.#internalSeq, command: CustomRequests.VariablesBatch };
+    const args = { requests: references.map((variablesReference) => ({ variablesReference, format })) };
+    /** @type { Promise<Map<number, any[]>> } */
+    const batch = this.dbg.waitableSendRequest(request, args).then(
+      (res) => {
+        const results = new Map();
+        if (res.success) {
+          for (const { variablesReference, variables } of res.body.results) {
+            if (variables != null) {
+              results.set(variablesReference, variables);
+            }
+          }
+        }
+        return results;
+      },
+      () => new Map(),
+    );
+    for (const variablesReference of references) {
+      this.#prefetched.set(variablesReference, batch.then((results) => results.get(variablesReference) ?? null));
+    }
+    batch.then((results) => {
+      // The debuggee has been resumed since; the references are no longer valid.
+      if (generation != this.#variablesGeneration) {
+        return;
+      }
+      // Failed references aren't served from the batch; requests for them go to the adapter
+      for (const variablesReference of references) {
+        if (!results.has(variablesReference)) {
+          this.#prefetched.delete(variablesReference);
+        }
+      }
+      for (const [variablesReference, variables] of results) {
+        this.registerVariablePaths(variablesReference, variables);
+      }
+    });
+  }
+
+  // Called when the debuggee resumes; every variablesReference becomes invalid.
+  resetVariablePaths() {
+    this.#variablesGeneration++;
+    // If nothing got expanded (the debuggee was resumed before the UI got to it), keep what we had.
+    if (this.#expanded.size > 0) {
+      this.#previouslyExpanded = this.#expanded;
+      this.#expanded = new Set();
+    }
+    this.#variablePaths.clear();
+    this.#prefetched.clear();
+    this.#pendingVariables.clear();
+    this.#pendingScopes.clear();
+    this.#pendingStackTraces.clear();
+    this.#framePaths.clear();
+  }
+
   checkForHexFormatting(variablesReference, variables) {
     if (this.formattedVariablesMap.has(variablesReference)) {
       for (let v of variables) {
@@ -322,6 +530,7 @@ class MidasSessionBase extends DebugSession {
       this.#printer.reset();
     }
 
+    this.#pendingScopes.set(request.seq, args.frameId);
     this.dbg.sendRequest(request);
   }
 
@@ -514,6 +723,7 @@ class MidasSessionBase extends DebugSession {
     switch (command) {
       case "toggle-hex":
         this.formatValuesAsHex = !this.formatValuesAsHex;
+        this.#prefetched.clear();
         this.sendEvent(new InvalidatedEvent(["variables"]));
         break;
       case CustomRequests.RestartCheckpoint:
@@ -54,7 +54,8 @@ function serializeRequest(seq, request, args = {}) {
     arguments: args,
   };
   const data = JSON.stringify(json);
-  const length = data.length;
+  // Content-Length counts bytes, not UTF-16 code units
+  const length = Buffer.byteLength(data, "utf8");
   const res = `Content-Length: ${length}\r\n\r\n${data}`;
   return res;
 }
@@ -91,7 +92,8 @@ function processBuffer(contents) {
 }
 
 /**
- * Parses the contents in `buffer` using the packet metadata in `metadata`.
+ * Parses the contents in `buffer` using the packet metadata in `metadata`. `buffer` holds the raw bytes received,
+ * decoded as latin1 so that string offsets are byte offsets (which Content-Length is measured in).
  * Returns what's remaining in the buffer that's not parsed. Not every packet is required
  * to have been handled
  * @param {string} buffer
@@ -102,7 +104,7 @@ function parseBuffer(buffer, metadata) {
   let parsed_end = 0;
   const res = [];
   for (const { start, end } of metadata.filter((i) => i.all_received)) {
-    const data = buffer.slice(start, end);
+    const data = Buffer.from(buffer.slice(start, end), "latin1").toString("utf8");
     const json = JSON.parse(data);
     res.push(json);
     parsed_end = end;
@@ -142,7 +144,7 @@ class MidasCommunicationChannel {
   async connect() {
     this.channel = await this.resolveInputDataChannel().then((channel) => {
       channel.recv.on("data", (data) => {
-        const str = data.toString();
+        const str = data.toString("latin1");
         this.buffer = this.buffer.concat(str);
         const packets = processBuffer(this.buffer).filter((i) => i.all_received);
         const { buffer: remaining_buffer, protocol_messages } = parseBuffer(this.buffer, packets);
@@ -200,7 +202,7 @@ class UnixSocketCommunication extends MidasCommunicationChannel {
   async connect() {
     this.channel = await this.resolveInputDataChannel().then((channel) => {
       channel.recv.on("data", (data) => {
-        const str = data.toString();
+        const str = data.toString("latin1");
         this.buffer = this.buffer.concat(str);
         const packets = processBuffer(this.buffer).filter((i) => i.all_received);
         const { buffer: remaining_buffer, protocol_messages } = parseBuffer(this.buffer, packets);
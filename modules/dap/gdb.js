@@ -1,4 +1,7 @@
 "use strict";
+const { randomBytes } = require("crypto");
+const os = require("os");
+const path = require("path");
 const { InitializedEvent } = require("@vscode/debugadapter");
 const { getExtensionPathOf } = require("../utils/sysutils");
 const { UnixSocketCommunication } = require("./dap-utils");
@@ -7,22 +10,47 @@ const { MidasSessionBase } = require("./dap-base");
 const { CustomRequests } = require("../constants");
 const { consoleErr } = require("../utils/log");
 
+/**
+ * Picks socket paths, unique to this session, for the adapter in GDB to listen on. On Linux, the sockets live in the
+ * abstract namespace, so there are no files to collide over or clean up.
+ * @returns {{ commands: string, events: string }} - As passed to GDB; a leading "@" denotes the abstract namespace.
+ */
+function sessionSocketPaths() {
+  const name = `midas-${process.pid}-${randomBytes(6).toString("hex")}`;
+  if (process.platform === "linux") {
+    return { commands: `@${name}-commands`, events: `@${name}-events` };
+  }
+  return { commands: path.join(os.tmpdir(), `${name}-commands`), events: path.join(os.tmpdir(), `${name}-events`) };
+}
+
+/**
+ * @param {string} socketPath - As returned by `sessionSocketPaths`
+ * @returns {string} - The path to connect to
+ */
+function connectPath(socketPath) {
+  return socketPath.startsWith("@") ? `\0${socketPath.substring(1)}` : socketPath;
+}
+
 class GdbProcess extends DebuggerProcessBase {
   constructor(options) {
     super(options);
 
+    const sockets = sessionSocketPaths();
     try {
       const p = this.path();
       const args = this.spawnArgs();
-      this.spawnDebugger(p, args);
+      this.spawnDebugger(p, args, {
+        MIDAS_DAP_COMMANDS_SOCKET: sockets.commands,
+        MIDAS_DAP_EVENTS_SOCKET: sockets.events,
+      });
     } catch (ex) {
       consoleErr(`Creating instance of GdbProcess failed: ${ex}`);
       // re-throw exception - this must be a hard error
       throw ex;
     }
 
-    this.commands_socket = new UnixSocketCommunication("/tmp/midas-commands", this.messages);
-    this.events_socket = new UnixSocketCommunication("/tmp/midas-events", this.messages);
+    this.commands_socket = new UnixSocketCommunication(connectPath(sockets.commands), this.messages);
+    this.events_socket = new UnixSocketCommunication(connectPath(sockets.events), this.messages);
   }
 
   async initialize() {
@@ -79,6 +107,14 @@ class GdbDAPSession extends MidasSessionBase {
       args["trace"] = this.spawnConfig.trace;
       args["rr-session"] = this.spawnConfig.isRRSession();
       args["rrinit"] = getExtensionPathOf("rrinit");
+      args["flattenBaseClasses"] = this.spawnConfig.flattenBaseClasses;
+      args["cacheWatchExpressions"] = this.spawnConfig.cacheWatchExpressions;
+      args["samplingProfilerInterval"] = this.spawnConfig.samplingProfilerInterval;
+      args["instrumentationDirectory"] = this.spawnConfig.instrumentationDirectory;
+      args["multiInferior"] = this.spawnConfig.multiInferior;
+      args["prettyPrinterTimeBudget"] = this.spawnConfig.prettyPrinterTimeBudget;
+      args["prettyPrinterChildBudget"] = this.spawnConfig.prettyPrinterChildBudget;
+      args["lazyStringPrefix"] = this.spawnConfig.lazyStringPrefix;
 
       const res = await this.dbg.waitableSendRequest(
         { seq: 1, command: "initialize", arguments: args, type: "request" },
@@ -0,0 +1,57 @@
+import threading
+
+
+class CancellationToken:
+    __slots__ = ("cancelled",)
+
+    def __init__(self):
+        self.cancelled = False
+
+
+# Token of "no request"; never cancelled.
+NotCancellable = CancellationToken()
+
+
+class PendingRequests:
+    """Cancellation tokens of the requests that have been posted to GDB's thread and have not been answered yet,
+    keyed by request seq. The `cancel` request is handled on the command thread (GDB's thread might be busy with
+    the very request it's cancelling), so it can only flip a token; requests that haven't started when they're
+    cancelled are dropped by the handler and long running requests check `cancelled()` as they go, returning what
+    they have."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.tokens = {}
+        # Token of the request currently executing on GDB's thread
+        self.current = NotCancellable
+
+    def register(self, seq):
+        token = CancellationToken()
+        with self.lock:
+            self.tokens[seq] = token
+        return token
+
+    def cancel(self, seq):
+        """Returns False if the request `seq` isn't pending (it's already been answered)."""
+        with self.lock:
+            token = self.tokens.get(seq)
+        if token is None:
+            return False
+        token.cancelled = True
+        return True
+
+    def begin(self, token):
+        self.current = token
+
+    def end(self, seq):
+        self.current = NotCancellable
+        with self.lock:
+            self.tokens.pop(seq, None)
+
+
+pendingRequests = PendingRequests()
+
+
+def cancelled():
+    """Whether the request currently executing on GDB's thread has been cancelled."""
+    return pendingRequests.current.cancelled
@@ -0,0 +1,214 @@
+import gdb
+import bisect
+import re
+import threading
+import time
+from collections import deque
+from os import path
+import sys
+
+stdlibpath = path.dirname(path.realpath(__file__))
+utilspath = path.dirname(stdlibpath)
+if sys.path.count(utilspath) == 0:
+    sys.path.append(utilspath)
+
+import midas_utils
+
+# Commands whose argument is an expression; for these, the last word is completed from the symbol index.
+ExpressionCommands = {"print", "p", "output", "call", "inspect", "ptype", "whatis", "display", "x", "watch"}
+
+# Just like GDB's `max-completions` default. GDB is never asked for more than this many symbols at a time.
+MaxCompletions = 200
+
+# How many prefixes' symbol names are kept, before starting over.
+MaxCachedPrefixes = 1024
+
+# What `complete` prints last, when it stopped at max-completions.
+TruncatedMarker = "*** List may be truncated"
+
+# Wait this long (in seconds) after the last new objfile, before rebuilding the symbol index. Shared libraries are
+# loaded in bursts, there's no reason to start over for every single one of them.
+RebuildDelay = 0.5
+
+# How long (in ns) one slice of building the symbol index gets to run on GDB's thread, before it lets the requests
+# that queued up meanwhile run. A single `complete` may take longer, when it has to expand symbol tables.
+BuildSliceNs = 5_000_000
+
+# The characters symbol names start with, and the ones they continue with.
+SymbolStart = "ABCDEFGHIJKLMNOPQRSTUVWXYZ_abcdefghijklmnopqrstuvwxyz"
+SymbolContinuation = SymbolStart + "0123456789:"
+
+commandPattern = re.compile(r"^\s*([^\s]+)\s+")
+wordPattern = re.compile(r"[A-Za-z_][\w:]*$")
+
+
+def prefix_range(sorted_items, prefix):
+    lo = bisect.bisect_left(sorted_items, prefix)
+    # Every string starting with `prefix` sorts before prefix + the highest code point.
+    hi = bisect.bisect_left(sorted_items, prefix + "\U0010ffff", lo)
+    return sorted_items[lo:min(hi, lo + MaxCompletions)]
+
+
+def frame_symbol_names(prefix):
+    try:
+        block = gdb.selected_frame().block()
+    except Exception:
+        return []
+    names = []
+    while block is not None and not block.is_static:
+        names.extend(name for name in midas_utils.block_index(block).keys() if name.startswith(prefix))
+        block = block.superblock
+    return names
+
+
+def starting_with(sorted_items, prefix):
+    lo = bisect.bisect_left(sorted_items, prefix)
+    hi = bisect.bisect_left(sorted_items, prefix + "\U0010ffff", lo)
+    return sorted_items[lo:hi]
+
+
+class BoundedCompletions:
+    """Bounds `max-completions` to MaxCompletions while in use, so that GDB is never asked for more symbols at a
+    time; the user's setting is restored afterwards."""
+
+    def __enter__(self):
+        self.previous = gdb.parameter("max-completions")
+        self.bounded = self.previous is not None and 0 <= self.previous <= MaxCompletions
+        if not self.bounded:
+            gdb.execute(f"set max-completions {MaxCompletions}")
+        return self
+
+    def __exit__(self, *exc):
+        if not self.bounded:
+            limit = "unlimited" if self.previous is None or self.previous < 0 else self.previous
+            gdb.execute(f"set max-completions {limit}")
+        return False
+
+
+def complete_symbols(prefix):
+    """Asks GDB for (at most MaxCompletions) symbol names starting with `prefix`; max-completions must be bounded.
+    Returns (sorted names, whether GDB listed all of them)."""
+    lines = gdb.execute(f"complete print {prefix}", to_string=True).splitlines()
+    complete = not any(TruncatedMarker in line for line in lines)
+    names = sorted(
+        set(line[len("print "):] for line in lines if line.startswith("print ") and TruncatedMarker not in line)
+    )
+    return (names, complete)
+
+
+class CompletionIndex:
+    """Sorted prefix indexes of GDB's commands and of symbol names. Serves the common cases of the `completions`
+    request; anything context sensitive (like member access) is left to GDB.
+
+    Listing every symbol of a program expands all of its symbol tables, which takes seconds for large programs. The
+    symbol index is therefore built in slices on GDB's thread, a bounded number of symbols at a time, that requests
+    get to run in between. It's built once per set of objfiles, starting with the first completions request, and
+    rebuilt when objfiles are loaded or freed. Until it's built, symbols are looked up per prefix, a bounded number
+    at a time; a longer prefix is served from the names of a shorter one, when GDB could list all of those."""
+
+    def __init__(self):
+        self.commands = None
+        # Sorted names of all symbols, once built
+        self.index = None
+        # Whether a completions request has been served, i.e. whether the index is wanted
+        self.wanted = False
+        self.generation = 0
+        # Prefixes that are yet to be listed, and the names found so far, while the index is being built
+        self.pending = None
+        self.found = None
+        # prefix -> (sorted names, whether they're all the symbols starting with prefix)
+        self.symbols = {}
+        gdb.events.new_objfile.connect(self.invalidate)
+        gdb.events.clear_objfiles.connect(self.invalidate)
+
+    def invalidate(self, evt=None):
+        self.generation += 1
+        self.index = None
+        self.pending = None
+        self.symbols = {}
+        if self.wanted:
+            generation = self.generation
+            # Objfile events are emitted on GDB's thread; wait for the burst to settle before starting over.
+            timer = threading.Timer(RebuildDelay, lambda: gdb.post_event(lambda: self.start_build(generation)))
+            timer.daemon = True
+            timer.start()
+
+    def start_build(self, generation):
+        if generation != self.generation or self.pending is not None or self.index is not None:
+            return
+        self.pending = deque(SymbolStart)
+        self.found = set()
+        gdb.post_event(lambda: self.build_slice(generation))
+
+    def build_slice(self, generation):
+        if generation != self.generation:
+            return
+        started = time.perf_counter_ns()
+        try:
+            with BoundedCompletions():
+                while len(self.pending) > 0 and time.perf_counter_ns() - started < BuildSliceNs:
+                    prefix = self.pending.popleft()
+                    (names, complete) = complete_symbols(prefix)
+                    self.found.update(names)
+                    if not complete:
+                        # More than MaxCompletions names start with `prefix`; list them by longer prefixes
+                        self.pending.extend(prefix + c for c in SymbolContinuation)
+        except gdb.error:
+            # Completions keep being looked up per prefix
+            self.pending = None
+            self.found = None
+            return
+        if len(self.pending) > 0:
+            gdb.post_event(lambda: self.build_slice(generation))
+            return
+        self.index = sorted(self.found)
+        self.pending = None
+        self.found = None
+        self.symbols = {}
+
+    def symbol_names(self, prefix):
+        if self.index is not None:
+            return starting_with(self.index, prefix)
+        cached = self.symbols.get(prefix)
+        if cached is not None:
+            return cached[0]
+        for length in range(len(prefix) - 1, 0, -1):
+            shorter = self.symbols.get(prefix[:length])
+            if shorter is not None and shorter[1]:
+                cached = (starting_with(shorter[0], prefix), True)
+                break
+        if cached is None:
+            with BoundedCompletions():
+                cached = complete_symbols(prefix)
+        if len(self.symbols) >= MaxCachedPrefixes:
+            self.symbols = {}
+        self.symbols[prefix] = cached
+        return cached[0]
+
+    def complete(self, text):
+        """Returns the completions of `text`, or None if `text` can't be completed from the index."""
+        if self.commands is None:
+            self.commands = sorted(set(gdb.execute("complete ", to_string=True).splitlines()))
+        if not self.wanted:
+            self.wanted = True
+            self.start_build(self.generation)
+        m = commandPattern.match(text)
+        if m is None:
+            if text.strip() == "" or text != text.lstrip():
+                return None
+            return prefix_range(self.commands, text)
+
+        if m.group(1) not in ExpressionCommands:
+            return None
+        word = wordPattern.search(text, m.end())
+        if word is None:
+            return None
+        start = word.start()
+        if start > m.end() and text[start - 1] in ".>":
+            # Member access; needs the type of the expression.
+            return None
+        prefix = word.group(0)
+        names = set(prefix_range(self.symbol_names(prefix), prefix))
+        names.update(frame_symbol_names(prefix))
+        head = text[:start]
+        return [f"{head}{name}" for name in sorted(names)[:MaxCompletions]]
@@ -2,14 +2,13 @@ import gdb
 import gdb.types
 import traceback
 from io import StringIO
-from os import path, unlink
+from os import path, unlink, environ, getcwd
 import socket
 import json
 import sys
-import random
-import string
 import threading
 import re
+import time
 
 # Decorator functions
 import functools
@@ -26,6 +25,29 @@ if sys.path.count(stdlibpath) == 0:
     sys.path.append(stdlibpath)
 
 import logger as logmodule
+from watch_cache import WatchCache
+from thread_roster import ThreadRoster
+from completions import CompletionIndex
+import instrumentation as instrumentationmodule
+from instrumentation import QUEUE, EXECUTE, SERIALIZE, WRITE
+from cancellation import pendingRequests, cancelled
+from request_lanes import RequestLanes
+from selection import selectionTracker
+from optional_events import connect_optional
+from printer_budget import printerBudget
+import serialization
+from recording import SessionRecorder
+from errors import (
+    ExpectedErrors,
+    InvalidArguments,
+    InvalidReference,
+    NotFound,
+    SessionError,
+    EvaluationError,
+    Unsupported,
+)
+
+instrumentation = instrumentationmodule.instrumentation
 
 logger = logmodule.logger
 
@@ -36,7 +58,9 @@ from variables_reference import (
     StackFrame,
     clear_variable_references,
     create_eager_var_ref,
-    frame_variables
+    frame_variables,
+    set_flatten_base_classes,
+    set_lazy_string_prefix,
 )
 
 
@@ -58,10 +82,44 @@ singleThreadControl = False
 responsesQueue = Queue()
 eventsQueue = Queue()
 currentReturnValue = {}
+# All threads of all inferiors, maintained by thread events
+threadRoster = ThreadRoster()
+# Prefix indexes of commands and symbols, serving the `completions` request
+completionIndex = CompletionIndex()
+# Requests waiting to be executed on GDB's thread
+requestLanes = RequestLanes()
+# Opt-in cache for `watch` evaluations; configured by the `initialize` request
+watchCache = None
 
 session = None
-eventSocketPath = "/tmp/midas-events"
-commandSocketPath = "/tmp/midas-commands"
+sessionRecorder = None
+
+
+def socket_path(variable, default):
+    """The socket path the extension picked for this session, passed in the environment variable `variable`. A
+    leading @ denotes a socket in Linux's abstract namespace (environment variables can't hold the NUL that it
+    starts with). Falls back to `default` when GDB wasn't spawned by the extension."""
+    socketPath = environ.get(variable)
+    if socketPath is None:
+        return default
+    if socketPath.startswith("@"):
+        return f"\0{socketPath[1:]}"
+    return socketPath
+
+
+def remove_socket_file(socketPath):
+    # Abstract sockets have no file; they go away with the socket.
+    if socketPath.startswith("\0"):
+        return
+    try:
+        unlink(socketPath)
+    except OSError:
+        if path.exists(socketPath):
+            raise
+
+
+eventSocketPath = socket_path("MIDAS_DAP_EVENTS_SOCKET", "/tmp/midas-events")
+commandSocketPath = socket_path("MIDAS_DAP_COMMANDS_SOCKET", "/tmp/midas-commands")
 
 
 def iterate_options(opts):
@@ -82,7 +140,10 @@ class Session:
         self.started = False
         if self.type == "midas-rr":
             if initArgs.get("rrinit") is None:
-                raise Exception("Path to RR init script not provided. This initialization needs to happen before we setup the RR session.")
+                raise SessionError(
+                    "Path to RR init script not provided. "
+                    "This initialization needs to happen before we setup the RR session."
+                )
             loadRRConfiguration(initArgs["rrinit"])
 
     def is_rr_session(self):
@@ -91,7 +152,7 @@ class Session:
     def start_session(self, sessionArgs):
         global logger
         if self.started:
-            raise Exception("Session already started")
+            raise SessionError("Session already started")
         self.started = True
         self.sessionArgs = sessionArgs
         # These needs to be executed _first_ (otherwise what's the point?)
@@ -103,7 +164,7 @@ class Session:
 
         if sessionArgs["type"] == "launch":
             if sessionArgs.get("program") is None:
-                raise Exception("No program was provided for gdb to launch")
+                raise SessionError("No program was provided for gdb to launch")
             gdb.execute(f"file {sessionArgs['program']}")
             programArgs = " ".join(sessionArgs["args"])
             gdb.execute(f"set args {programArgs}")
@@ -112,7 +173,7 @@ class Session:
             gdb.execute("set tcp connect-timeout 10000")
             gdb.execute(sessionArgs["command"])
         else:
-            raise Exception(f"Unknown session type {sessionArgs['type']}")
+            raise SessionError(f"Unknown session type {sessionArgs['type']}")
 
     def start_tracee(self):
         global singleThreadControl
@@ -172,12 +233,12 @@ class Args:
         keys = args.keys()
         for arg in keys:
             if arg not in self.supported:
-                raise Exception(
+                raise InvalidArguments(
                     f"Argument {arg} not supported. Supported args: {self.supported}"
                 )
         for arg in self.required:
             if arg not in keys:
-                raise Exception(
+                raise InvalidArguments(
                     f"Missing required argument: {arg}. Required args: {self.required}"
                 )
 
@@ -190,7 +251,7 @@ class ArbitraryOptionalArgs(Args):
         keys = args.keys()
         for arg in self.required:
             if arg not in keys:
-                raise Exception(
+                raise InvalidArguments(
                     f"Missing required argument: {arg}. Required args: {self.required}"
                 )
 
@@ -210,6 +271,9 @@ def request(name, req_args=Args()):
             logger.log_request(name, args)
             try:
                 result = fn(args)
+            except ExpectedErrors as e:
+                logger.log_msg(f"[req error]: [{name}] -> {e}\n")
+                raise e
             except Exception as e:
                 logger.log_exception(name, e)
                 raise e
@@ -222,18 +286,35 @@ def request(name, req_args=Args()):
     return dec
 
 
-def generate_socket_path():
-    return "/tmp/midas-" + "".join(
-        random.choice(string.ascii_uppercase) for i in range(10)
-    )
+def select_inferior(num):
+    selected = selectionTracker.thread()
+    if selected is not None and selected.inferior.num == num:
+        return
+    try:
+        gdb.execute(f"inferior {num}", to_string=True)
+        selectionTracker.invalidate()
+    except gdb.error:
+        # The request is answered in the context of the current inferior. If that's wrong, it'll fail on its own.
+        logger.log_msg(f"[route]: no inferior {num}\n")
 
 
 def select_thread(threadId):
-    for t in gdb.selected_inferior().threads():
-        if t.global_num == threadId:
-            t.switch()
-            return t
-    raise Exception(f"Found no thread with id {threadId}")
+    global threadRoster
+    t = threadRoster.thread(threadId)
+    if t is None:
+        raise InvalidReference(f"Found no thread with id {threadId}")
+    selectionTracker.select_thread(t)
+    return t
+
+
+def thread_started(evt):
+    global threadRoster
+    threadRoster.add(evt.inferior_thread)
+
+
+def thread_exited(evt):
+    global threadRoster
+    threadRoster.remove(evt.inferior_thread.global_num)
 
 
 def iterate_frames(frame, count=None, start=None):
@@ -250,6 +331,24 @@ def iterate_frames(frame, count=None, start=None):
         count_ -= 1
 
 
+def watch_result(expression, value, format):
+    if can_var_ref(value):
+        ref = create_eager_var_ref(expression, value, expression)
+        res = ref.ui_data()
+        res["result"] = res.pop("value")
+        return res
+    else:
+        if format and bool(format["hex"]):
+            result = value.format_string(format="x")
+        else:
+            result = str(value)
+        return {
+            "result": result,
+            "variablesReference": 0,
+            "memoryReference": hex(int(value.address)),
+        }
+
+
 @request("evaluate", Args(["expression", "context"], ["frameId", "format"]))
 def evaluate(args):
     global running_to_event_or_restarting_checkpoint
@@ -262,40 +361,26 @@ def evaluate(args):
         except Exception as e:
             running_to_event_or_restarting_checkpoint = False
             return {"result": f"{e}", "variablesReference": 0}
+        finally:
+            # The command may have selected another thread, frame or inferior
+            selectionTracker.invalidate()
     elif args["context"] == "watch":
         try:
-            value = gdb.parse_and_eval(args["expression"])
-            if can_var_ref(value):
-                ref = create_eager_var_ref(args["expression"], value, args["expression"])
-                res = ref.ui_data()
-                res["result"] = res.pop("value")
-                return res
-            else:
-                if args.get("format") and bool(args.get("format")["hex"]):
-                    result = value.format_string(format="x")
-                else:
-                    result = str(value)
-                return {
-                    "result": result,
-                    "variablesReference": 0,
-                    "memoryReference": hex(int(value.address)),
-                }
+            if watchCache is not None:
+                return watchCache.evaluate(args["expression"], args.get("format"))
+            return watch_result(args["expression"], gdb.parse_and_eval(args["expression"]), args.get("format"))
         except:
             return {"result": "couldn't be evaluated", "variablesReference": 0}
-    raise Exception("evaluate request failed")
+    raise EvaluationError("evaluate request failed")
 
 
-@request("threads", Args())
+# `since` is not defined by the DAP spec. Clients that pass the `generation` of a previous response, only get the
+# threads that changed since, and the ids of the threads that were removed since. Threads of all inferiors are
+# returned; requests that name one of them switch to its inferior implicitly.
+@request("threads", Args([], ["since"]))
 def threads_request(args):
-    res = []
-    for t in gdb.selected_inferior().threads():
-        thr_name = "No thread name"
-        if t.name is not None:
-            thr_name = t.name
-        if t.details is not None:
-            thr_name = t.details
-        res.append({"id": t.global_num, "name": f"{thr_name} (#{t.global_num})"})
-    return {"threads": res}
+    global threadRoster
+    return threadRoster.threads(since=args.get("since"))
 
 def artificial_values(thread):
     global currentReturnValue
@@ -341,22 +426,45 @@ def scopes(args):
     global variableReferences
     sf = variableReferences.get(args["frameId"])
     if sf is None:
-        raise Exception(f"Failed to get frame with id {args['frameId']}")
+        raise InvalidReference(f"Failed to get frame with id {args['frameId']}")
     return {"scopes": sf.scopes()}
 
 
-@request("variables", Args(["variablesReference"], ["start", "count", "format"]))
-def variables(args):
+def container_contents(args):
     global variableReferences
     container = variableReferences.get(args["variablesReference"])
     if container is None:
-        raise Exception(
+        raise InvalidReference(
             f"Failed to get variablesReference {args['variablesReference']}"
         )
-    variables = container.contents(
+    # Clients ask for the named and the indexed children of a row that reports `indexedVariables` separately
+    if args.get("filter") == "named" and container.indexedOnly:
+        return []
+    container.select_owner()
+    return container.contents(
         args.get("format"), args.get("start"), args.get("count")
     )
-    return {"variables": variables}
+
+
+@request("variables", Args(["variablesReference"], ["filter", "start", "count", "format"]))
+def variables(args):
+    return {"variables": container_contents(args)}
+
+
+# Not defined by the DAP spec. Serves multiple `variables` requests in one round trip. Each entry in `requests`
+# takes the same arguments as a `variables` request, `filter` included. A failing entry doesn't fail the entire
+# batch.
+@request("variablesBatch", Args(["requests"]))
+def variables_batch(args):
+    results = []
+    for req in args["requests"]:
+        if cancelled():
+            break
+        try:
+            results.append({"variablesReference": req["variablesReference"], "variables": container_contents(req)})
+        except Exception as e:
+            results.append({"variablesReference": req.get("variablesReference"), "message": f"{e}"})
+    return {"results": results}
 
 
 @request("continue", Args(["threadId"], ["singleThread"]))
@@ -496,6 +604,9 @@ def disassemble(args):
     pcIdx = 0
 
     while True:
+        # Return what has been disassembled so far, if any
+        if cancelled() and len(dis) > 0:
+            break
         try:
             dis = arch.disassemble(start_pc=startPC, end_pc=endPC)
         except gdb.MemoryError:
@@ -552,22 +663,40 @@ def disconnect(args):
     return {}
 
 
+# Not defined by the DAP spec
+@request("watch-cache-stats", ArbitraryOptionalArgs())
+def watch_cache_stats(args):
+    if watchCache is None:
+        return {"enabled": False}
+    stats = watchCache.stats()
+    stats["enabled"] = True
+    return stats
+
+
+# Not defined by the DAP spec
+@request("latency-histograms", ArbitraryOptionalArgs())
+def latency_histograms(args):
+    global instrumentation
+    return instrumentation.dump()
+
+
 @request("exceptionInfo", Args(["threadId"], []))
 def exception_info(args):
     global exceptionInfos
     info = exceptionInfos.get(args["threadId"])
     if info is None:
-        raise Exception(f"Exception Info {args['threadId']} not found.")
+        raise NotFound(f"Exception Info {args['threadId']} not found.")
     return info
 
 
 @request("completions", Args(["text", "column"], ["frameId", "line"]))
 def completions(args):
+    global completionIndex
     replace_len = len(args["text"])
-    result = [
-        {"label": item, "length": replace_len}
-        for item in gdb.execute(f"complete {args['text']}", to_string=True).splitlines()
-    ]
+    items = completionIndex.complete(args["text"])
+    if items is None:
+        items = gdb.execute(f"complete {args['text']}", to_string=True).splitlines()
+    result = [{"label": item, "length": replace_len} for item in items]
     return {"targets": result}
 
 
@@ -576,8 +705,22 @@ def initialize(args):
     global logger
     global Handler
     global session
+    global watchCache
 
     session = Session(args)
+    set_flatten_base_classes(args.get("flattenBaseClasses"))
+    set_lazy_string_prefix(args.get("lazyStringPrefix"))
+    printerBudget.configure(args.get("prettyPrinterTimeBudget"), args.get("prettyPrinterChildBudget"))
+    if args.get("samplingProfilerInterval"):
+        # Requests are handled on GDB's thread, which is the thread we're on now.
+        instrumentation.start_profiler(float(args.get("samplingProfilerInterval")), threading.get_ident())
+    instrumentation.configure_output(args.get("instrumentationDirectory"), args.get("samplingProfilerInterval"))
+    if args.get("cacheWatchExpressions"):
+        watchCache = WatchCache(watch_result, lambda value: not can_var_ref(value))
+    if args.get("multiInferior"):
+        # Keep forked children attached, as inferiors of this GDB (and this adapter), and resume them all together.
+        gdb.execute("set detach-on-fork off")
+        gdb.execute("set schedule-multiple on")
 
     if args.get("trace") == "Full":
         logger.init_perf_log("perf.log")
@@ -634,7 +777,7 @@ def initialize(args):
         "supportsReadMemoryRequest": True,
         "supportsWriteMemoryRequest": not bool(args.get("rr-session")),
         "supportsDisassembleRequest": True,
-        "supportsCancelRequest": False,
+        "supportsCancelRequest": True,
         "supportsBreakpointLocationsRequest": False,
         "supportsClipboardContext": False,
         "supportsSteppingGranularity": True,
@@ -648,7 +791,7 @@ def initialize(args):
 def configuration_done(args):
     global session
     if session is None:
-        raise Exception("Session has not been configured")
+        raise SessionError("Session has not been configured")
     else:
         session.start_tracee()
     return {}
@@ -734,6 +877,10 @@ def selectThread(args):
     select_thread(args["threadId"])
     return {}
 
+# Large reads are done in chunks of this size, checking for cancellation in between.
+ReadMemoryChunkSize = 64 * 1024
+
+
 @request("readMemory", Args(["memoryReference", "count"], ["offset"]))
 def read_memory(args):
     offset = args.get("offset")
@@ -741,10 +888,18 @@ def read_memory(args):
         offset = 0
     try:
         base_address = int(args["memoryReference"], 16) + offset
-        data = gdb.selected_inferior().read_memory(base_address, args["count"])
+        inferior = gdb.selected_inferior()
+        count = args["count"]
+        chunks = []
+        read = 0
+        while read < count and not cancelled():
+            size = min(ReadMemoryChunkSize, count - read)
+            chunks.append(inferior.read_memory(base_address + read, size))
+            read += size
+        # If cancelled, `data` is shorter than `count`, which the spec allows.
         return {
             "address": hex(base_address),
-            "data": base64.b64encode(data).decode("ascii"),
+            "data": base64.b64encode(b"".join(chunks)).decode("ascii"),
         }
     except:
         return {"address": hex(base_address), "unreadableBytes": args["count"]}
@@ -805,7 +960,7 @@ def restart_checkpoint(args):
     global running_to_event_or_restarting_checkpoint
     has_cp = int(args["id"]) in [cp["id"] for cp in get_checkpoints()]
     if not has_cp:
-        raise Exception(f"Checkpoint {args['id']} was not found")
+        raise NotFound(f"Checkpoint {args['id']} was not found")
     running_to_event_or_restarting_checkpoint = True
     gdb.execute(f"restart {args['id']}")
     return {}
@@ -981,7 +1136,7 @@ def set_ins_bps(args):
 
 @request("source", Args(["sourceReference"], ["source"]))
 def source(args):
-    raise Exception("source not implemented")
+    raise Unsupported("source not implemented")
 
 
 @request("stepBack", Args(["threadId"], ["singleThread", "granularity"]))
@@ -1041,10 +1196,10 @@ eventSocket = None
 cmdConn = None
 
 
-def prep_event(seq, evt):
-    evt["seq"] = seq
-    payload = json.dumps(evt)
-    return f"Content-Length: {len(payload)}\r\n\r\n{payload}"
+if environ.get("MIDAS_DAP_RECORD"):
+    sessionRecorder = SessionRecorder(
+        environ.get("MIDAS_DAP_RECORD"), environ.get("MIDAS_DAP_RECORD_WORKSPACE") or getcwd(), stdlibpath
+    )
 
 
 def event_thread():
@@ -1052,11 +1207,7 @@ def event_thread():
     global eventSocketPath
 
     # remove the socket file if it already exists
-    try:
-        unlink(eventSocketPath)
-    except OSError:
-        if path.exists(eventSocketPath):
-            raise
+    remove_socket_file(eventSocketPath)
 
     eventSocket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
     eventSocket.bind(eventSocketPath)
@@ -1065,10 +1216,12 @@ def event_thread():
     global seq
     while run:
         res = eventsQueue.get()
-        logger.log_msg(msg=f"[evt]: {json.dumps(res)}\n")
-        packet = prep_event(seq, res)
+        if sessionRecorder is not None:
+            sessionRecorder.record("event", res["event"])
+        packet = serialization.event(seq, res)
+        logger.log_event(res)
         seq += 1
-        event_connection.sendall(bytes(packet, "utf-8"))
+        event_connection.sendall(packet)
 
 interpolationPattern = r'\{([^}]+)\}'
 
@@ -1102,57 +1255,47 @@ def send_event(evt, body):
     eventsQueue.put({"type": "event", "event": evt, "body": body})
 
 
-def prep_response(seq, request_seq, success, command, message=None, body=None):
-    payload = json.dumps(
-        {
-            "type": "response",
-            "seq": seq,
-            "request_seq": request_seq,
-            "success": success,
-            "command": command,
-            "message": message,
-            "body": body,
-        }
-    )
-    return f"Content-Length: {len(payload)}\r\n\r\n{payload}"
-
-
-DAPHeader = "Content-Length:"
-HeaderLen = len(DAPHeader)
-
-
-def check_header(header):
-    if not header.startswith(DAPHeader):
-        raise Exception("Invalid Header for request")
+def cancelled_response(seq, req_seq, req):
+    return {
+        "seq": seq,
+        "req_seq": req_seq,
+        "cmd": req,
+        "success": False,
+        "message": "cancelled",
+        "body": None,
+    }
 
 
-def parse_one_request(data) -> (dict, str):
-    global DAPHeader
-    global HeaderLen
-    res = None
-    # we expect newlines to be \r\n as per the DA Protocol
-    buffer = StringIO(data, "\r\n")
-    content_len = None
-    header = buffer.readline().strip()
-    try:
-        check_header(header)
-        header_payload = header[HeaderLen:].strip()
-        content_len = int(header_payload)
-        buffer.readline()
-        current = buffer.tell()
-        payload = buffer.read(content_len)
-        if buffer.tell() - current != content_len:
-            raise
-        res = json.loads(payload)
-        return (res, buffer.read())
-    except:
-        # No message can be parsed from the current contents of `data`
-        return (None, data)
+# Expected failures (see errors.py) are answered with their message only; no stack trace is formatted or sent.
+def expected_error_response(seq, req_seq, req, error):
+    return {
+        "seq": seq,
+        "req_seq": req_seq,
+        "cmd": req,
+        "success": False,
+        "message": f"{error}",
+        # Session errors are shown to the user, whichever request ran into them
+        "body": {"error": {"showUser": True}} if isinstance(error, SessionError) else None,
+    }
 
 
-def LoggingCommandHandler(seq, req_seq, req, args):
+def LoggingCommandHandler(seq, req_seq, req, args, posted, token):
     global logger
     global commands
+    global instrumentation
+    started = time.perf_counter_ns()
+    instrumentation.record(req, QUEUE, started - posted)
+    if token.cancelled:
+        # Cancelled while waiting in the queue; drop it without executing.
+        pendingRequests.end(req_seq)
+        instrumentation.count(req, "cancelled")
+        logger.log_msg(f"[cancelled]: [{req}] seq={req_seq}\n")
+        responsesQueue.put(cancelled_response(seq, req_seq, req))
+        return
+    pendingRequests.begin(token)
+    printerBudget.begin()
+    instrumentation.command = req
+    logger.seq = req_seq
     cmd = commands.get(req)
     try:
         body = logger.perf_log(lambda: cmd(args), req)
@@ -1164,6 +1307,8 @@ def LoggingCommandHandler(seq, req_seq, req, args):
             "message": None,
             "body": body,
         }
+    except ExpectedErrors as e:
+        res = expected_error_response(seq, req_seq, req, e)
     except Exception as e:
         try:
             args_contents = json.dumps(args)
@@ -1181,12 +1326,28 @@ def LoggingCommandHandler(seq, req_seq, req, args):
                 }
             },
         }
+    instrumentation.command = None
+    logger.seq = None
+    pendingRequests.end(req_seq)
+    instrumentation.record(req, EXECUTE, time.perf_counter_ns() - started)
     responsesQueue.put(res)
 
 
 # The CommandHandler callable gets posted via a lambda. That way, we can catch exceptions and place those values on the thread safe queue as well
-def CommandHandler(seq, req_seq, req, args):
+def CommandHandler(seq, req_seq, req, args, posted, token):
     global commands
+    global instrumentation
+    started = time.perf_counter_ns()
+    instrumentation.record(req, QUEUE, started - posted)
+    if token.cancelled:
+        # Cancelled while waiting in the queue; drop it without executing.
+        pendingRequests.end(req_seq)
+        instrumentation.count(req, "cancelled")
+        responsesQueue.put(cancelled_response(seq, req_seq, req))
+        return
+    pendingRequests.begin(token)
+    printerBudget.begin()
+    instrumentation.command = req
     cmd = commands.get(req)
     try:
         body = cmd(args)
@@ -1198,6 +1359,8 @@ def CommandHandler(seq, req_seq, req, args):
             "message": None,
             "body": body,
         }
+    except ExpectedErrors as e:
+        res = expected_error_response(seq, req_seq, req, e)
     except Exception as e:
         res = {
             "seq": seq,
@@ -1207,6 +1370,9 @@ def CommandHandler(seq, req_seq, req, args):
             "message": f"{e}",
             "body": {"error": {"stacktrace": traceback.format_exc()}},
         }
+    instrumentation.command = None
+    pendingRequests.end(req_seq)
+    instrumentation.record(req, EXECUTE, time.perf_counter_ns() - started)
     responsesQueue.put(res)
 
 
@@ -1219,7 +1385,10 @@ def start_command_response_thread():
     global responsesQueue
     while run:
         res = responsesQueue.get()
-        response = prep_response(
+        if sessionRecorder is not None:
+            sessionRecorder.record_response(res["req_seq"], res["cmd"], res["success"], res["body"])
+        serialize_start = time.perf_counter_ns()
+        data = serialization.response(
             seq=res["seq"],
             request_seq=res["req_seq"],
             success=res["success"],
@@ -1227,7 +1396,10 @@ def start_command_response_thread():
             message=res["message"],
             body=res["body"],
         )
-        cmdConn.sendall(bytes(response, "utf-8"))
+        write_start = time.perf_counter_ns()
+        cmdConn.sendall(data)
+        instrumentation.record(res["cmd"], SERIALIZE, write_start - serialize_start)
+        instrumentation.record(res["cmd"], WRITE, time.perf_counter_ns() - write_start)
     gdb.post_event(lambda: gdb.execute("exit"))
 
 
@@ -1237,10 +1409,31 @@ def set_configuration():
     gdb.execute("set python print-stack full")
 
 
+# Handled on the command thread, as soon as it's read off the socket; GDB's thread may be busy with the request
+# that's being cancelled. Progress cancellation (`progressId`) is not supported, as no progress events are sent.
+def cancel_request(req):
+    args = req.get("arguments") or {}
+    if args.get("requestId") is not None:
+        pendingRequests.cancel(args["requestId"])
+    responsesQueue.put(
+        {
+            "seq": 0,
+            "req_seq": req.get("seq"),
+            "cmd": "cancel",
+            "success": True,
+            "message": None,
+            "body": None,
+        }
+    )
+
+
 def handle_request(req):
     global commands
     global Handler
     cmd = req.get("command")
+    if cmd == "cancel":
+        cancel_request(req)
+        return
     command_handler = commands.get(cmd)
 
     if command_handler is None:
@@ -1251,7 +1444,45 @@ def handle_request(req):
     req_seq = req.get("seq")
     if req_seq is None:
         raise gdb.GdbError("Request sequence number not found")
-    gdb.post_event(lambda: Handler(0, req_seq, cmd, args))
+    # Not defined by the DAP spec. Any request may name the inferior it's meant for; it's selected before the
+    # request executes. Requests that name a thread are routed by the thread.
+    inferior = args.pop("inferiorId", None) if args is not None else None
+    token = pendingRequests.register(req_seq)
+    requestLanes.push(req_seq, cmd, args, time.perf_counter_ns(), token, inferior)
+    # One event per request. Which request an event runs is decided when it runs, so that requests that arrived
+    # later can be served first.
+    gdb.post_event(run_next_request)
+
+
+StaleRequestMessage = "Request was issued before the debuggee resumed; its references are no longer valid"
+
+
+def run_next_request():
+    global requestLanes
+    entry = requestLanes.pop()
+    if entry is None:
+        return
+    try:
+        if requestLanes.is_stale(entry):
+            # Cheap, expected failure; don't touch GDB or format any tracebacks.
+            pendingRequests.end(entry.req_seq)
+            instrumentation.count(entry.command, "stale")
+            responsesQueue.put(
+                {
+                    "seq": 0,
+                    "req_seq": entry.req_seq,
+                    "cmd": entry.command,
+                    "success": False,
+                    "message": StaleRequestMessage,
+                    "body": None,
+                }
+            )
+        else:
+            if entry.inferior is not None:
+                select_inferior(entry.inferior)
+            Handler(0, entry.req_seq, entry.command, entry.args, entry.posted, entry.token)
+    finally:
+        requestLanes.done()
 
 
 def start_command_thread():
@@ -1264,18 +1495,13 @@ def start_command_thread():
     # Must be turned off; otherwise `gdb.execute("kill")` will crash gdb
     gdb.post_event(set_configuration)
     # remove the socket file if it already exists
-    try:
-        unlink(commandSocketPath)
-    except OSError:
-        if path.exists(commandSocketPath):
-            raise
+    remove_socket_file(commandSocketPath)
     cmd_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
     cmd_socket.bind(commandSocketPath)
     cmd_socket.listen(1)
     cmdConn, client_address = cmd_socket.accept()
-    # TODO(simon): do something better than just using a dumb string as a buffer. For now, it's the simplest solution (though stupid).
-    # Re-use the memory instead reducing allocations.
-    buffer = ""
+    # Content-Length counts bytes, so messages are parsed before being decoded.
+    buffer = b""
     responder_thread = threading.Thread(
         target=start_command_response_thread, name="Responder", daemon=True
     )
@@ -1283,14 +1509,16 @@ def start_command_thread():
     try:
         while run:
             data = cmdConn.recv(4096)
-            buffer = buffer + data.decode("utf-8")
+            buffer = buffer + data
             req = None
-            (req, buffer) = parse_one_request(buffer)
+            (req, buffer) = serialization.parse_one(buffer)
             while req is not None:
+                if sessionRecorder is not None:
+                    sessionRecorder.record_request(req)
                 handle_request(req)
-                (req, buffer) = parse_one_request(buffer)
+                (req, buffer) = serialization.parse_one(buffer)
     finally:
-        unlink(commandSocketPath)
+        remove_socket_file(commandSocketPath)
 
 
 def ensure_stopped_handler_last(evt):
@@ -1390,6 +1618,7 @@ def on_exit(evt):
 
 gdb.events.exited.connect(on_exit)
 
+gdb.events.new_thread.connect(thread_started)
 gdb.events.new_thread.connect(
     lambda evt: send_event(
         "thread", {"reason": "started", "threadId": evt.inferior_thread.global_num}
@@ -1397,6 +1626,7 @@ gdb.events.new_thread.connect(
 )
 
 gdb.events.cont.connect(continued_event)
+gdb.events.cont.connect(requestLanes.resumed)
 
 
 def bkpt_created(bp):
@@ -1415,13 +1645,11 @@ def bkpt_modified(bp):
 gdb.events.breakpoint_modified.connect(bkpt_modified)
 
 
-# thread_exited event doesn't exist in version 13.2, but will exist in future versions
-if hasattr(gdb.events, "thread_exited"):
-    gdb.events.thread_exited.connect(
-        lambda evt: send_event(
-            "thread", {"reason": "exited", "threadId": evt.inferior_thread.global_num}
-        )
-    )
+connect_optional("thread_exited", thread_exited)
+connect_optional(
+    "thread_exited",
+    lambda evt: send_event("thread", {"reason": "exited", "threadId": evt.inferior_thread.global_num}),
+)
 
 gdb.events.gdb_exiting.connect(lambda evt: send_event("terminated", {}))
 gdb.events.stop.connect(stopped)
@@ -1444,13 +1672,14 @@ import atexit
 def clean_up():
     global eventSocketPath
     global commandSocketPath
+    instrumentation.write_files()
     try:
-        unlink(eventSocketPath)
+        remove_socket_file(eventSocketPath)
     except:
         pass
 
     try:
-        unlink(commandSocketPath)
+        remove_socket_file(commandSocketPath)
     except:
         pass
 
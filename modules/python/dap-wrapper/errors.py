@@ -0,0 +1,35 @@
+import gdb
+
+
+class AdapterError(Exception):
+    """Expected failure of a request: bad input from the client, or state that went away. These are answered with
+    their message only; formatting a stack trace is reserved for genuine internal errors."""
+
+
+class InvalidArguments(AdapterError):
+    pass
+
+
+class InvalidReference(AdapterError):
+    """A variablesReference, frame id or thread id that doesn't (or no longer) exist."""
+
+
+class NotFound(AdapterError):
+    pass
+
+
+class SessionError(AdapterError):
+    """The request doesn't fit the state of the debug session."""
+
+
+class EvaluationError(AdapterError):
+    pass
+
+
+class Unsupported(AdapterError):
+    pass
+
+
+# GDB raises gdb.error (and its subclass gdb.MemoryError) for unreadable memory, optimized out values, unknown
+# symbols and the like. Those are as expected as AdapterErrors.
+ExpectedErrors = (AdapterError, gdb.error)
@@ -0,0 +1,236 @@
+import json
+import sys
+import tempfile
+import threading
+import time
+from array import array
+from os import getpid, makedirs, path
+
+# The stages a request goes through. `queue` is the time spent waiting in gdb.post_event's queue.
+Stages = ("queue", "execute", "serialize", "write")
+QUEUE, EXECUTE, SERIALIZE, WRITE = range(len(Stages))
+
+# How many printers the instrumentation dump lists, slowest first.
+SlowestPrinterCount = 10
+
+# Bucket N holds samples shorter than 2^N microseconds. The last bucket holds everything longer than that too.
+BucketCount = 32
+
+
+def bucket_upper_bound_ms(bucket):
+    return (1 << bucket) / 1000
+
+
+class Histogram:
+    """Fixed bucket latency histogram. Recording a sample does no allocations."""
+
+    __slots__ = ("buckets", "count", "total_ns", "max_ns")
+
+    def __init__(self):
+        self.buckets = array("Q", bytes(8 * BucketCount))
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def record(self, ns):
+        bucket = (ns // 1000).bit_length()
+        if bucket >= BucketCount:
+            bucket = BucketCount - 1
+        self.buckets[bucket] += 1
+        self.count += 1
+        self.total_ns += ns
+        if ns > self.max_ns:
+            self.max_ns = ns
+
+    def percentile_ms(self, p):
+        """Upper bound (in ms) of the bucket containing the p:th percentile."""
+        threshold = self.count * p
+        seen = 0
+        for bucket in range(BucketCount):
+            seen += self.buckets[bucket]
+            if seen >= threshold:
+                return bucket_upper_bound_ms(bucket)
+        return bucket_upper_bound_ms(BucketCount - 1)
+
+    def summary(self):
+        if self.count == 0:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "meanMs": self.total_ns / self.count / 1_000_000,
+            "maxMs": self.max_ns / 1_000_000,
+            "p50Ms": self.percentile_ms(0.5),
+            "p90Ms": self.percentile_ms(0.9),
+            "p99Ms": self.percentile_ms(0.99),
+            # Only the non-empty buckets: upper bound (ms) -> samples
+            "buckets": {
+                f"{bucket_upper_bound_ms(bucket)}": self.buckets[bucket]
+                for bucket in range(BucketCount)
+                if self.buckets[bucket] != 0
+            },
+        }
+
+
+class PrinterStats:
+    """Time spent in, and children produced by, one pretty printer class."""
+
+    __slots__ = ("calls", "total_ns", "max_ns", "children")
+
+    def __init__(self):
+        self.calls = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.children = 0
+
+    def record(self, ns, children):
+        self.calls += 1
+        self.total_ns += ns
+        self.children += children
+        if ns > self.max_ns:
+            self.max_ns = ns
+
+    def summary(self):
+        return {
+            "calls": self.calls,
+            "totalMs": self.total_ns / 1_000_000,
+            "meanMs": self.total_ns / self.calls / 1_000_000,
+            "maxMs": self.max_ns / 1_000_000,
+            "children": self.children,
+        }
+
+
+def frame_name(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """Samples the Python stack of GDB's thread every `interval_ms` and aggregates the samples, attributed to the
+    DAP command being handled, in the collapsed stack format used by flamegraph tools. Time spent inside GDB shows
+    up as the Python function that called into GDB. Samples taken while no command is being handled are dropped."""
+
+    def __init__(self, instrumentation, interval_ms, thread_ident):
+        self.instrumentation = instrumentation
+        self.interval = interval_ms / 1000
+        self.thread_ident = thread_ident
+        # collapsed stack -> sample count
+        self.samples = {}
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name="Sampling Profiler", daemon=True)
+        self.thread.start()
+
+    def run(self):
+        while self.running:
+            time.sleep(self.interval)
+            command = self.instrumentation.command
+            if command is None:
+                continue
+            frame = sys._current_frames().get(self.thread_ident)
+            names = []
+            while frame is not None:
+                names.append(frame_name(frame))
+                frame = frame.f_back
+            names.append(command)
+            names.reverse()
+            stack = ";".join(names)
+            self.samples[stack] = self.samples.get(stack, 0) + 1
+
+    def stop(self):
+        self.running = False
+
+    def write(self, file_path):
+        with open(file_path, "w") as file:
+            for (stack, count) in list(self.samples.items()):
+                file.write(f"{stack} {count}\n")
+
+
+class Instrumentation:
+    """Always-on latency histograms, per DAP command and per stage. Every stage is only ever recorded by one thread
+    (queue and execute on GDB's thread, serialize and write on the responder thread), so only creating the
+    histograms of a command needs locking."""
+
+    def __init__(self):
+        self.commands = {}
+        # command -> outcome (like "stale" or "cancelled") -> number of requests answered without being executed
+        self.outcomes = {}
+        # pretty printer class -> PrinterStats
+        self.printers = {}
+        self.started = time.perf_counter_ns()
+        # The DAP command currently being handled on GDB's thread
+        self.command = None
+        self.profiler = None
+        self.lock = threading.Lock()
+        # Where `write_files` writes to; None to not write anything
+        self.directory = None
+
+    def configure_output(self, directory, profiling):
+        """Writes the histograms (and the profile) to `directory` when the session ends. Profiling sessions that
+        don't name a directory write to the system's temporary directory."""
+        if directory:
+            self.directory = directory
+        elif profiling:
+            self.directory = tempfile.gettempdir()
+
+    def start_profiler(self, interval_ms, thread_ident):
+        if self.profiler is None:
+            self.profiler = SamplingProfiler(self, interval_ms, thread_ident)
+
+    def histograms(self, command):
+        hists = self.commands.get(command)
+        if hists is None:
+            # The first request of a command can be recorded by both threads at once
+            with self.lock:
+                hists = self.commands.get(command)
+                if hists is None:
+                    hists = tuple(Histogram() for _ in Stages)
+                    self.commands[command] = hists
+        return hists
+
+    def record(self, command, stage, ns):
+        self.histograms(command)[stage].record(ns)
+
+    def count(self, command, outcome):
+        outcomes = self.outcomes.setdefault(command, {})
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+
+    def record_printer(self, printer, ns, children):
+        stats = self.printers.get(printer)
+        if stats is None:
+            stats = PrinterStats()
+            self.printers[printer] = stats
+        stats.record(ns, children)
+
+    def slowest_printers(self):
+        printers = sorted(list(self.printers.items()), key=lambda item: item[1].total_ns, reverse=True)
+        return {printer: stats.summary() for (printer, stats) in printers[:SlowestPrinterCount]}
+
+    def dump(self):
+        return {
+            "uptimeMs": (time.perf_counter_ns() - self.started) / 1_000_000,
+            "commands": {
+                command: {stage: hists[idx].summary() for (idx, stage) in enumerate(Stages)}
+                for (command, hists) in list(self.commands.items())
+            },
+            "skipped": {command: dict(outcomes) for (command, outcomes) in list(self.outcomes.items())},
+            "slowestPrinters": self.slowest_printers(),
+        }
+
+    def write_files(self):
+        """Writes latency-histograms-<pid>.json (and profile-<pid>.folded, when profiling) to the configured
+        directory. Sessions can run side by side; their files are told apart by GDB's pid. Failures are reported on
+        stderr."""
+        if self.profiler is not None:
+            self.profiler.stop()
+        if self.directory is None:
+            return
+        try:
+            makedirs(self.directory, exist_ok=True)
+            with open(path.join(self.directory, f"latency-histograms-{getpid()}.json"), "w") as file:
+                json.dump(self.dump(), file, indent=2)
+            if self.profiler is not None:
+                self.profiler.write(path.join(self.directory, f"profile-{getpid()}.folded"))
+        except OSError as e:
+            print(f"Failed to write instrumentation to {self.directory}: {e}", file=sys.stderr)
+
+
+instrumentation = Instrumentation()
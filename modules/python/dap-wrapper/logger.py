@@ -1,6 +1,8 @@
 import time
 import json
 import traceback
+import threading
+from collections import deque
 from os import path
 import sys
 
@@ -10,19 +12,85 @@ if sys.path.count(stdlibpath) == 0:
 
 this = sys.modules[__name__]
 
+# Max number of records waiting to be written. When full, the oldest records are dropped (and counted).
+LogBufferCapacity = 65536
+
+# How often (in seconds) the writer thread flushes buffered records to disk.
+FlushInterval = 0.05
+
+
+class LogRecord:
+    """A structured log entry. Formatting, including any JSON serialization of `payload`, is deferred until the
+    record is written, which happens on the log writer thread."""
+
+    __slots__ = ("timestamp", "kind", "command", "seq", "payload")
+
+    def __init__(self, kind, command, seq, payload):
+        self.timestamp = time.time()
+        self.kind = kind
+        self.command = command
+        self.seq = seq
+        self.payload = payload
+
+    def format(self):
+        if self.kind == "perf":
+            return f"[{self.command}]: {self.payload / (1000 * 1000)} ms\n"
+        data = json.dumps(self.payload)
+        return f"{self.timestamp:.6f} [{self.kind}]: [{self.command}] seq={self.seq} size={len(data)} {data}\n"
+
 
 class LogFile:
+    """Log file written by a background thread. Logging only appends to a bounded ring buffer, so the thread doing
+    the logging (typically GDB's) never waits on the disk."""
+
     def __init__(self, name):
         global stdlibpath
         self.name = name
         self.path = f"{stdlibpath}/{name}"
-        self.file = open(self.path, "w")
+        self.file = open(self.path, "wb")
+        self.records = deque(maxlen=LogBufferCapacity)
+        self.dropped = 0
+        self.closing = threading.Event()
+        self.writer = threading.Thread(target=self.write_records, name=f"Log writer {name}", daemon=True)
+        self.writer.start()
+
+    def append(self, record):
+        if len(self.records) == LogBufferCapacity:
+            self.dropped += 1
+        self.records.append(record)
 
     def log(self, msg):
-        self.file.write(msg)
+        self.append(msg)
+
+    def log_record(self, record):
+        self.append(record)
+
+    def flush_records(self):
+        batch = []
+        while True:
+            try:
+                record = self.records.popleft()
+            except IndexError:
+                break
+            try:
+                batch.append(record if isinstance(record, str) else record.format())
+            except Exception as e:
+                batch.append(f"[log error]: failed to format {record.kind} record for {record.command}: {e}\n")
+        if self.dropped > 0:
+            batch.append(f"[log]: dropped {self.dropped} records; log buffer full\n")
+            self.dropped = 0
+        if len(batch) > 0:
+            self.file.write("".join(batch).encode("utf-8"))
+
+    def write_records(self):
+        while not self.closing.wait(FlushInterval):
+            self.flush_records()
 
     def close(self):
         print(f"Flushing contents to {self.path}")
+        self.closing.set()
+        self.writer.join(timeout=1.0)
+        self.flush_records()
         self.file.flush()
         self.file.close()
 
@@ -32,6 +100,8 @@ class Logger:
         self.perf = None
         self.debug = None
         self.custom = {}
+        # Sequence number of the request currently being handled, if known.
+        self.seq = None
 
     def init_custom(self, log_name):
         self.custom[log_name] = LogFile(log_name)
@@ -44,11 +114,15 @@ class Logger:
 
     def log_request(self, fn, args):
         if self.debug is not None:
-            self.debug.log(msg=f"[req]: [{fn}] <- {json.dumps(args)}\n")
+            self.debug.log_record(LogRecord("req", fn, self.seq, args))
 
     def log_response(self, fn, res):
         if self.debug is not None:
-            self.debug.log(msg=f"[res]: [{fn}] -> {json.dumps(res)}\n")
+            self.debug.log_record(LogRecord("res", fn, self.seq, res))
+
+    def log_event(self, evt):
+        if self.debug is not None:
+            self.debug.log_record(LogRecord("evt", evt.get("event"), evt.get("seq"), evt))
 
     def log_exception(self, fn, exc):
         if self.debug is not None:
@@ -70,12 +144,14 @@ class Logger:
         start = time.perf_counter_ns()
         res = fn()
         end = time.perf_counter_ns()
-        self.perf.log(msg=f"[{msg}]: {(end-start) / (1000 * 1000)} ms\n")
+        self.perf.log_record(LogRecord("perf", msg, self.seq, end - start))
         return res
 
     def atexit(self):
-        self.perf.close()
-        self.debug.close()
+        if self.perf is not None:
+            self.perf.close()
+        if self.debug is not None:
+            self.debug.close()
         for log in self.custom.values():
             log.close()
 
@@ -90,4 +166,4 @@ def clean_up():
     this.logger.atexit()
 
 
-atexit.register(clean_up)
\ No newline at end of file
+atexit.register(clean_up)
@@ -0,0 +1,12 @@
+import gdb
+
+
+def connect_optional(name, handler):
+    """Connects `handler` to the event registry gdb.events.`name`, if this version of GDB has it. Some events (like
+    thread_exited, which GDB 13.2 lacks) don't exist in all versions; returns whether `handler` got connected, so
+    that callers can make up for the missing event otherwise."""
+    registry = getattr(gdb.events, name, None)
+    if registry is None:
+        return False
+    registry.connect(handler)
+    return True
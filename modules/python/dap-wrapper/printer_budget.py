@@ -0,0 +1,133 @@
+import time
+
+from instrumentation import instrumentation
+
+# Formatting a value that takes longer than this (in ns) is attributed to the value's pretty printer, if it has
+# one. Looking printers up for every formatted value would cost more than most printers do.
+SlowFormatNs = 1_000_000
+
+
+def printer_name(pp):
+    cls = type(pp)
+    return f"{cls.__module__}.{cls.__qualname__}"
+
+
+class PrinterBudget:
+    """How much time and how many children pretty printers get to spend, per request. Printers are user code (or
+    libstdc++'s) and a single slow one can stall the entire Variables view; when the budget runs out, the children
+    produced so far are returned, followed by a "…more" entry that continues where they left off. Configured by the
+    `initialize` request; `None` means unlimited."""
+
+    def __init__(self):
+        self.time_ns = None
+        self.children = None
+        self.deadline = None
+        self.children_left = None
+
+    def configure(self, time_ms, children):
+        self.time_ns = int(float(time_ms) * 1_000_000) if time_ms else None
+        self.children = int(children) if children else None
+
+    def begin(self):
+        """Starts the budget of a new request."""
+        self.deadline = time.perf_counter_ns() + self.time_ns if self.time_ns is not None else None
+        self.children_left = self.children
+
+    def spend_child(self):
+        if self.children_left is not None:
+            self.children_left -= 1
+
+    def exhausted(self):
+        if self.children_left is not None and self.children_left <= 0:
+            return True
+        return self.deadline is not None and time.perf_counter_ns() >= self.deadline
+
+
+printerBudget = PrinterBudget()
+
+
+def to_string(pp):
+    """Calls `pp.to_string()`, accounting the time spent to the printer."""
+    started = time.perf_counter_ns()
+    try:
+        return pp.to_string()
+    finally:
+        instrumentation.record_printer(printer_name(pp), time.perf_counter_ns() - started, 0)
+
+
+def num_children(pp):
+    """Calls `pp.num_children()`, accounting the time spent to the printer."""
+    started = time.perf_counter_ns()
+    try:
+        return pp.num_children()
+    finally:
+        instrumentation.record_printer(printer_name(pp), time.perf_counter_ns() - started, 0)
+
+
+class ChildCursor:
+    """Where listing the children of a pretty printer left off: the printer's iterator and the index of the next
+    child to list. Listing from a cursor picks up where the previous listing stopped, instead of iterating the
+    children before it again. Holds values of the current stop, just like variables references do."""
+
+    def __init__(self, pp, position=0):
+        self.pp = pp
+        self.name = printer_name(pp)
+        self.position = position
+        self.iterator = None
+        # How many children have been taken from `iterator`
+        self.taken = 0
+        # A child taken from `iterator` when the budget ran out; it's the one at `position`
+        self.pending = None
+
+    def open(self):
+        # Printers that provide children_range and num_children can start at `position` directly
+        if self.position > 0 and hasattr(self.pp, "children_range") and hasattr(self.pp, "num_children"):
+            self.iterator = iter(self.pp.children_range(self.position, self.pp.num_children()))
+            self.taken = self.position
+        else:
+            self.iterator = iter(self.pp.children())
+            self.taken = 0
+
+
+def children(cursor, count=None):
+    """Yields (at most `count` of) the children of a pretty printer from `cursor` on, while the budget lasts, and
+    advances the cursor. Yields (None, None) in place of the first child that's past the budget; that includes the
+    children iterated past to get to the cursor's position. Time spent in the printer and the number of children it
+    produced are accounted to it."""
+    spent = 0
+    taken = cursor.taken
+    listed = 0
+    started = time.perf_counter_ns()
+    try:
+        if cursor.iterator is None:
+            cursor.open()
+            taken = cursor.taken
+        spent += time.perf_counter_ns() - started
+        while count is None or listed < count:
+            if cursor.taken < cursor.position and printerBudget.exhausted():
+                # Ran out while getting to the cursor's position; the continuation picks up from here
+                yield (None, None)
+                return
+            child = cursor.pending
+            if child is None:
+                started = time.perf_counter_ns()
+                try:
+                    child = next(cursor.iterator)
+                except StopIteration:
+                    return
+                finally:
+                    spent += time.perf_counter_ns() - started
+                cursor.taken += 1
+                if cursor.taken <= cursor.position:
+                    continue
+                if printerBudget.exhausted():
+                    cursor.pending = child
+                    yield (None, None)
+                    return
+            cursor.pending = None
+            cursor.position += 1
+            listed += 1
+            printerBudget.spend_child()
+            yield child
+    finally:
+        instrumentation.record_printer(cursor.name, spent, cursor.taken - taken)
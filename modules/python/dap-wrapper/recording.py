@@ -0,0 +1,97 @@
+import json
+import threading
+import time
+from os import path, sep
+
+# Stand-ins for machine specific path prefixes in recordings
+WorkspaceVariable = "${workspaceFolder}"
+AdapterVariable = "${adapterDirectory}"
+
+# Arguments that hold ids handed out by the adapter, and the kind of id they hold. Ids depend on the run (and the
+# order GDB happens to do things in), so they're mapped from the ids of the recording to the ids of the replay.
+IdArguments = {"threadId": "thread", "frameId": "frame", "variablesReference": "reference"}
+
+
+def substitute(value, replacements):
+    """`value` (a request's arguments) with every string that starts with the path `prefix` of one of the
+    `replacements` (prefix, replacement) starting with `replacement` instead."""
+    if isinstance(value, str):
+        for (prefix, replacement) in replacements:
+            if value == prefix or value.startswith(prefix + sep) or value.startswith(prefix + "/"):
+                return replacement + value[len(prefix):]
+        return value
+    if isinstance(value, list):
+        return [substitute(item, replacements) for item in value]
+    if isinstance(value, dict):
+        return {key: substitute(item, replacements) for (key, item) in value.items()}
+    return value
+
+
+def handed_out_ids(command, body):
+    """The ids the response `body` of `command` hands out, by kind, in the order they appear in."""
+    if body is None:
+        return {}
+    if command == "threads":
+        return {"thread": [thread["id"] for thread in body.get("threads", [])]}
+    if command == "stackTrace":
+        return {"frame": [frame["id"] for frame in body.get("stackFrames", [])]}
+    if command == "scopes":
+        return {"reference": [scope["variablesReference"] for scope in body.get("scopes", [])]}
+    if command == "variables":
+        return {"reference": [var["variablesReference"] for var in body.get("variables", [])]}
+    if command == "variablesBatch":
+        rows = [var for result in body.get("results", []) for var in result.get("variables", [])]
+        return {"reference": [var["variablesReference"] for var in rows]}
+    if command in ("evaluate", "setVariable", "setExpression"):
+        return {"reference": [body.get("variablesReference", 0)]}
+    return {}
+
+
+def map_ids(arguments, ids):
+    """`arguments` with every id in them mapped by `ids` (kind -> recorded id -> id). Ids that weren't seen in the
+    recording are kept as they are."""
+    if isinstance(arguments, list):
+        return [map_ids(item, ids) for item in arguments]
+    if isinstance(arguments, dict):
+        result = {}
+        for (key, value) in arguments.items():
+            kind = IdArguments.get(key)
+            if kind is not None and isinstance(value, int):
+                result[key] = ids.get(kind, {}).get(value, value)
+            else:
+                result[key] = map_ids(value, ids)
+        return result
+    return arguments
+
+
+class SessionRecorder:
+    """Records the requests entering the command thread, the ids handed out by the responses and the names of the
+    events sent to the client, as JSON lines, so that the session can be replayed by the benchmark harness
+    (test/bench/dapbench.py). Enabled by setting the environment variable MIDAS_DAP_RECORD to the path of the
+    recording. Paths in the workspace (MIDAS_DAP_RECORD_WORKSPACE, or GDB's working directory) and in the adapter's
+    directory are recorded relative to them, so that a recording can be replayed on another machine."""
+
+    def __init__(self, file_path, workspace, adapter_directory):
+        self.file = open(file_path, "w")
+        self.lock = threading.Lock()
+        self.started = time.perf_counter()
+        # Longest prefix first, should one directory be inside the other
+        self.replacements = sorted(
+            [(path.normpath(workspace), WorkspaceVariable), (path.normpath(adapter_directory), AdapterVariable)],
+            key=lambda replacement: len(replacement[0]),
+            reverse=True,
+        )
+
+    def record(self, kind, payload):
+        line = json.dumps({"t": time.perf_counter() - self.started, kind: payload})
+        with self.lock:
+            self.file.write(f"{line}\n")
+            self.file.flush()
+
+    def record_request(self, req):
+        self.record("request", substitute(req, self.replacements))
+
+    def record_response(self, request_seq, command, success, body):
+        ids = handed_out_ids(command, body) if success else {}
+        if len(ids) > 0:
+            self.record("response", {"request_seq": request_seq, "command": command, "ids": ids})
@@ -0,0 +1,156 @@
+import threading
+from collections import deque
+
+# Control flow requests. These are served before any queued inspection request.
+ControlRequests = {
+    "pause",
+    "pauseAll",
+    "continue",
+    "continueAll",
+    "next",
+    "stepIn",
+    "stepOut",
+    "stepBack",
+    "reverseContinue",
+    "reverse-finish",
+    "run-to-event",
+    "disconnect",
+    "terminate",
+}
+
+# Control requests that interrupt (or end) the debuggee. These are served before any other queued request, no
+# matter how long the queue ahead of them is. The other control requests keep their place behind requests like
+# setBreakpoints, so that a continue can't overtake the breakpoints set before it.
+InterruptRequests = {"pause", "pauseAll", "disconnect", "terminate"}
+
+# Control requests that resume (or end) the debuggee. Inspection requests issued before one of these, inspect a
+# stop that's about to be gone.
+ResumeRequests = ControlRequests - {"pause", "pauseAll"}
+
+# Requests that only inspect the current stop; safe to reorder behind control requests and to discard once stale.
+# The `repl` context of `evaluate` runs arbitrary commands and is kept in order with everything else.
+InspectionRequests = {
+    "stackTrace",
+    "scopes",
+    "variables",
+    "variablesBatch",
+    "evaluate",
+    "readMemory",
+    "disassemble",
+    "exceptionInfo",
+    "completions",
+    "dataBreakpointInfo",
+}
+
+
+# Requests that refer to variablesReference ids, which are only valid during the stop they were handed out in.
+StopBoundRequests = {"scopes", "variables", "variablesBatch", "dataBreakpointInfo"}
+
+
+def is_inspection(command, args):
+    if command == "evaluate":
+        return args is not None and args.get("context") != "repl"
+    return command in InspectionRequests
+
+
+def is_stop_bound(command, args):
+    if command in StopBoundRequests:
+        return True
+    # frameIds are variablesReference ids too
+    return (
+        command in ("evaluate", "completions") and is_inspection(command, args) and args.get("frameId") is not None
+    )
+
+
+class QueuedRequest:
+    __slots__ = (
+        "order",
+        "req_seq",
+        "command",
+        "args",
+        "posted",
+        "token",
+        "inspection",
+        "generation",
+        "stop_bound",
+        "inferior",
+    )
+
+    def __init__(self, order, req_seq, command, args, posted, token, generation, inferior):
+        self.order = order
+        self.req_seq = req_seq
+        self.command = command
+        self.args = args
+        self.posted = posted
+        self.token = token
+        self.inspection = is_inspection(command, args)
+        # The stop the request was issued for
+        self.generation = generation
+        self.stop_bound = is_stop_bound(command, args)
+        # The inferior the request is routed to, if it named one
+        self.inferior = inferior
+
+
+class RequestLanes:
+    """Requests waiting for GDB's thread. Interrupt requests (like `pause`) wait in a lane of their own that's
+    served before everything else. Inspection requests wait in their own lane too, so that control requests can be
+    served ahead of them, while the relative order of all other requests is kept. A resume request cancels (see
+    cancellation.py) the inspection requests that arrived before it, including the one executing, since their
+    results would be stale by the time the client sees them.
+
+    Every resume bumps `generation`. Stop bound requests that arrived during an earlier generation refer to ids
+    that have been cleared and are answered with a canned error instead of being executed."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.interrupts = deque()
+        self.ordered = deque()
+        self.inspection = deque()
+        self.order = 0
+        # The request executing on GDB's thread
+        self.executing = None
+        self.generation = 0
+
+    def push(self, req_seq, command, args, posted, token, inferior=None):
+        with self.lock:
+            self.order += 1
+            entry = QueuedRequest(self.order, req_seq, command, args, posted, token, self.generation, inferior)
+            if entry.inspection:
+                self.inspection.append(entry)
+                return
+            if command in InterruptRequests:
+                self.interrupts.append(entry)
+            else:
+                self.ordered.append(entry)
+            if command in ResumeRequests:
+                for stale in self.inspection:
+                    stale.token.cancelled = True
+                executing = self.executing
+                if executing is not None and executing.inspection:
+                    executing.token.cancelled = True
+
+    def pop(self):
+        with self.lock:
+            if len(self.interrupts) > 0:
+                entry = self.interrupts.popleft()
+            elif len(self.ordered) == 0 and len(self.inspection) == 0:
+                return None
+            elif len(self.inspection) == 0:
+                entry = self.ordered.popleft()
+            elif len(self.ordered) == 0:
+                entry = self.inspection.popleft()
+            elif self.ordered[0].command in ControlRequests or self.ordered[0].order < self.inspection[0].order:
+                entry = self.ordered.popleft()
+            else:
+                entry = self.inspection.popleft()
+            self.executing = entry
+            return entry
+
+    def done(self):
+        self.executing = None
+
+    def resumed(self, evt=None):
+        self.generation += 1
+
+    def is_stale(self, entry):
+        return entry.stop_bound and entry.generation != self.generation
@@ -0,0 +1,50 @@
+import gdb
+
+from optional_events import connect_optional
+
+
+class SelectionTracker:
+    """The thread and frame selected in GDB (the thread also determines the selected inferior), as far as the
+    adapter knows. Consecutive requests mostly target the same thread and frame, and switching to the thread or
+    frame that's already selected still costs a round trip to GDB, and possibly register fetches from the target.
+    Anything that can change the selection behind the adapter's back (resuming, stopping, inferiors exiting, REPL
+    commands) invalidates what's known."""
+
+    def __init__(self):
+        self.selected_thread = None
+        # None when unknown; switching threads selects the newest frame, but there's no gdb.Frame to compare with.
+        self.selected_frame = None
+        gdb.events.cont.connect(self.invalidate)
+        gdb.events.stop.connect(self.invalidate)
+        gdb.events.exited.connect(self.invalidate)
+        connect_optional("thread_exited", self.invalidate)
+
+    def invalidate(self, evt=None):
+        self.selected_thread = None
+        self.selected_frame = None
+
+    def thread(self):
+        """The selected thread."""
+        if self.selected_thread is None:
+            self.selected_thread = gdb.selected_thread()
+        return self.selected_thread
+
+    def select_thread(self, thread):
+        # GDB hands out one InferiorThread object per thread, so identity is equality.
+        if self.selected_thread is thread:
+            return
+        thread.switch()
+        self.selected_thread = thread
+        self.selected_frame = None
+
+    def select_frame(self, thread, frame):
+        """Selects `frame` of `thread`."""
+        self.select_thread(thread)
+        # Frames compare by frame id; the objects differ between calls of older(), newest_frame() and the like.
+        if self.selected_frame is not None and self.selected_frame == frame:
+            return
+        frame.select()
+        self.selected_frame = frame
+
+
+selectionTracker = SelectionTracker()
@@ -0,0 +1,116 @@
+import json
+
+# orjson is considerably faster than the standard library, but it's not always installed alongside GDB's Python.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+DAPHeader = b"Content-Length: "
+HeaderTerminator = b"\r\n\r\n"
+
+# Compact separators and no ASCII escaping; payloads are measured in bytes after encoding, as the protocol
+# requires.
+stdlibEncoder = json.JSONEncoder(ensure_ascii=False, check_circular=False, separators=(",", ":"))
+
+
+def stdlib_dumps(obj):
+    return stdlibEncoder.encode(obj).encode("utf-8")
+
+
+if orjson is not None:
+
+    def dumps(obj):
+        """Serializes `obj` to UTF-8 encoded JSON."""
+        try:
+            return orjson.dumps(obj)
+        except TypeError:
+            # orjson refuses integers wider than 64 bits, which the standard library handles.
+            return stdlib_dumps(obj)
+
+    loads = orjson.loads
+
+else:
+    dumps = stdlib_dumps
+    loads = json.loads
+
+Backend = "orjson" if orjson is not None else "json"
+
+
+def frame(payload):
+    """Prefixes the encoded `payload` with its DAP header."""
+    return b"".join((DAPHeader, str(len(payload)).encode("ascii"), HeaderTerminator, payload))
+
+
+# Pre-rendered response envelopes, keyed by (command, success). Everything but the seqs and the body is fixed.
+envelopes = {}
+
+
+def envelope_tail(command, success):
+    key = (command, success)
+    tail = envelopes.get(key)
+    if tail is None:
+        tail = b"".join(
+            (
+                b',"success":',
+                b"true" if success else b"false",
+                b',"command":',
+                dumps(command),
+                b',"message":null,"body":',
+            )
+        )
+        envelopes[key] = tail
+    return tail
+
+
+def response(seq, request_seq, success, command, message=None, body=None):
+    """Returns the framed bytes of a DAP response."""
+    if message is not None:
+        payload = dumps(
+            {
+                "type": "response",
+                "seq": seq,
+                "request_seq": request_seq,
+                "success": success,
+                "command": command,
+                "message": message,
+                "body": body,
+            }
+        )
+    else:
+        payload = b"".join(
+            (
+                b'{"type":"response","seq":',
+                str(seq).encode("ascii"),
+                b',"request_seq":',
+                str(request_seq).encode("ascii"),
+                envelope_tail(command, success),
+                dumps(body),
+                b"}",
+            )
+        )
+    return frame(payload)
+
+
+def event(seq, evt):
+    """Returns the framed bytes of the DAP event `evt`."""
+    evt["seq"] = seq
+    return frame(dumps(evt))
+
+
+def parse_one(data):
+    """Parses one DAP message off the front of the bytes `data`. Returns (message, remaining bytes), or
+    (None, data) if `data` doesn't hold an entire message yet."""
+    header_end = data.find(HeaderTerminator)
+    if header_end == -1:
+        return (None, data)
+    header = data[:header_end].strip()
+    if not header.startswith(DAPHeader.strip()):
+        # Not a DAP message; nothing can be parsed from `data`
+        return (None, data)
+    content_len = int(header[len(DAPHeader.strip()) :])
+    start = header_end + len(HeaderTerminator)
+    end = start + content_len
+    if len(data) < end:
+        return (None, data)
+    return (loads(data[start:end]), data[end:])
@@ -0,0 +1,114 @@
+import gdb
+import time
+
+# Thread names are re-read at most this often (in seconds). Reading `details` may have to query the target.
+NameRefreshInterval = 1.0
+
+# How many thread removals are remembered, for clients that ask for deltas.
+MaxRemovalLog = 4096
+
+
+def thread_display_name(thread, qualify):
+    name = "No thread name"
+    if thread.name is not None:
+        name = thread.name
+    if thread.details is not None:
+        name = thread.details
+    if qualify:
+        return f"{name} (#{thread.global_num}, inferior {thread.inferior.num})"
+    return f"{name} (#{thread.global_num})"
+
+
+class RosterEntry:
+    def __init__(self, thread, generation):
+        self.thread = thread
+        self.id = thread.global_num
+        self.inferior = thread.inferior.num
+        self.name = None
+        self.refreshed = None
+        self.generation = generation
+
+    def ui_data(self):
+        return {"id": self.id, "name": self.name}
+
+
+class ThreadRoster:
+    """All threads of all inferiors, keyed by global thread number. Kept up to date by the new_thread and
+    thread_exited events, so that the `threads` request doesn't have to rebuild the list on every stop. Every
+    change bumps `generation`, which lets clients ask for only what changed since a generation they've seen."""
+
+    def __init__(self):
+        self.entries = {}
+        self.generation = 0
+        # (generation, thread id)
+        self.removed = []
+        # Clients that last saw a generation older than this, can't be served a delta
+        self.oldest_delta = 0
+        self.seeded = False
+        # Whether names say which inferior their thread belongs to; only done while there's more than one.
+        self.qualified = False
+
+    def add(self, thread):
+        self.generation += 1
+        self.entries[thread.global_num] = RosterEntry(thread, self.generation)
+
+    def remove(self, id):
+        if self.entries.pop(id, None) is not None:
+            self.generation += 1
+            self.removed.append((self.generation, id))
+            if len(self.removed) > MaxRemovalLog:
+                (self.oldest_delta, _) = self.removed.pop(0)
+
+    def seed(self):
+        for inferior in gdb.inferiors():
+            for t in inferior.threads():
+                if t.global_num not in self.entries:
+                    self.add(t)
+        self.seeded = True
+
+    def prune(self):
+        # Threads can exit unnoticed, in versions of GDB without the thread_exited event
+        for id in [id for (id, entry) in self.entries.items() if not entry.thread.is_valid()]:
+            self.remove(id)
+
+    def thread(self, id):
+        """Returns the (valid) thread with global number `id`, or None. Rescans all inferiors on a miss."""
+        entry = self.entries.get(id)
+        if entry is None or not entry.thread.is_valid():
+            self.prune()
+            self.seed()
+            entry = self.entries.get(id)
+        return entry.thread if entry is not None else None
+
+    def refresh_names(self):
+        now = time.monotonic()
+        qualify = len({entry.inferior for entry in self.entries.values()}) > 1
+        force = qualify != self.qualified
+        self.qualified = qualify
+        for entry in self.entries.values():
+            if force or entry.refreshed is None or now - entry.refreshed >= NameRefreshInterval:
+                entry.refreshed = now
+                name = thread_display_name(entry.thread, qualify)
+                if name != entry.name:
+                    if entry.name is not None:
+                        self.generation += 1
+                    entry.name = name
+                    entry.generation = self.generation
+
+    def threads(self, since=None):
+        """Returns the body of a `threads` response. If `since` is a generation the client has seen, only the
+        threads that were added or changed since and the ids of the threads that were removed since, are
+        returned."""
+        if not self.seeded:
+            self.seed()
+        self.prune()
+        self.refresh_names()
+        entries = self.entries.values()
+        if since is None or since < self.oldest_delta:
+            return {"threads": [entry.ui_data() for entry in entries], "generation": self.generation}
+        return {
+            "threads": [entry.ui_data() for entry in entries if entry.generation > since],
+            "removed": [id for (generation, id) in self.removed if generation > since],
+            "generation": self.generation,
+            "delta": True,
+        }
@@ -2,16 +2,60 @@ import gdb
 import gdb.types
 
 from os import path
+import codecs
+import json
 import sys
+import time
 
 variableReferences = {}
 exceptionInfos = {}
 
+# When set, members of base classes are displayed inline with the members of the derived type, instead of as
+# nested, expandable base class entries. Configured by the `initialize` request.
+flattenBaseClasses = False
+
+# Lazy strings (what pretty printers of std::string and the like return) are displayed as at most this many
+# characters; the rest is read only when they're expanded, one page of characters per child. Configured by the
+# `initialize` request.
+lazyStringPrefix = 200
+LazyStringPageSize = 4096
+# The smallest memory page size of the platforms rr supports; GDB can't be asked for it.
+MemoryPageSize = 4096
+
+# Flattened member layouts, keyed by type name. Built once per type, by walking the inheritance graph.
+inheritanceGraphs = {}
+
+# Formatted type names, keyed by (type code, type name). Formatting a type goes through GDB's type printer; the
+# children of a container mostly share a handful of types, so each is formatted once and every row shares the
+# string.
+typeNames = {}
+
+# Register names of register groups, keyed by (architecture name, group name). These never change.
+registerGroups = {}
+
+# The (unformatted) register values of frames, keyed by (thread, frame level), as they were during the previous
+# stop and the current stop. Used to flag registers that changed.
+previousStopRegisters = {}
+currentStopRegisters = {}
+
 # Add "this" to the path, so we can import variables_reference module
 stdlibpath = path.dirname(path.realpath(__file__))
 if sys.path.count(stdlibpath) == 0:
     sys.path.append(stdlibpath)
 
+# Add the parent directory to the path, so we can import midas_utils
+utilspath = path.dirname(stdlibpath)
+if sys.path.count(utilspath) == 0:
+    sys.path.append(utilspath)
+
+import midas_utils
+from cancellation import cancelled
+from errors import NotFound
+from selection import selectionTracker
+import printer_budget
+from printer_budget import SlowFormatNs
+from instrumentation import instrumentation
+
 
 def clear_variable_references(evt):
     global variableReferences
@@ -22,6 +66,66 @@ def clear_variable_references(evt):
 
 gdb.events.cont.connect(clear_variable_references)
 
+
+def rotate_register_history(evt):
+    global previousStopRegisters
+    global currentStopRegisters
+    # If the UI didn't look at the registers during a stop, keep comparing against what it last saw.
+    if len(currentStopRegisters) > 0:
+        previousStopRegisters = currentStopRegisters
+        currentStopRegisters = {}
+
+
+gdb.events.cont.connect(rotate_register_history)
+
+
+def set_flatten_base_classes(flatten):
+    global flattenBaseClasses
+    flattenBaseClasses = bool(flatten)
+
+
+def set_lazy_string_prefix(length):
+    global lazyStringPrefix
+    if length is not None and int(length) > 0:
+        lazyStringPrefix = int(length)
+
+
+def clear_inheritance_graphs(evt):
+    global inheritanceGraphs
+    global typeNames
+    inheritanceGraphs.clear()
+    typeNames.clear()
+
+
+# Type layouts can change when symbols are (re)loaded.
+gdb.events.new_objfile.connect(clear_inheritance_graphs)
+gdb.events.clear_objfiles.connect(clear_inheritance_graphs)
+
+def type_name(type):
+    # Qualified types share their name with the unqualified type, but not their formatting.
+    if type.name is None or type != type.unqualified():
+        return f"{type}"
+    key = (type.code, type.name)
+    name = typeNames.get(key)
+    if name is None:
+        name = sys.intern(f"{type}")
+        typeNames[key] = name
+    return name
+
+
+def variable_row(name, value, type=None, evaluateName=None, variablesReference=0, memoryReference=None):
+    """A `Variable` of a variables response. Optional fields that aren't set are left out, rather than sent as
+    null; in large expansions those made up a good part of the payload."""
+    row = {"name": name, "value": value, "variablesReference": variablesReference}
+    if type is not None:
+        row["type"] = type
+    if evaluateName is not None:
+        row["evaluateName"] = evaluateName
+    if memoryReference is not None:
+        row["memoryReference"] = memoryReference
+    return row
+
+
 def can_var_ref(value):
     if hasattr(value, "type"):
         return can_var_ref_type(value.type)
@@ -40,12 +144,22 @@ def can_var_ref_type(type):
 
 # Base class Widget Reference - representing a container-item/widget in the VSCode UI
 class VariablesReference:
-    def __init__(self, name):
+    # Whether every child is an indexed one (i.e. the row reports `indexedVariables` and no `namedVariables`)
+    indexedOnly = False
+
+    def __init__(self, name, owner=None):
         global variableReferences
         self.name = name
         self.id = len(variableReferences) + 1
+        # The thread (and so, the inferior) the contents are read from. Ids are unique across inferiors; a request
+        # for a reference that belongs to another inferior than the selected one, switches to it first.
+        self.owner = owner if owner is not None else selectionTracker.thread()
         variableReferences[self.id] = self
 
+    def select_owner(self):
+        if self.owner is not None and self.owner.is_valid():
+            selectionTracker.select_thread(self.owner)
+
     def contents(self):
         raise Exception("'contents' method not supported by this class")
 
@@ -83,9 +197,10 @@ def frame_variables(frame):
 class StackFrame(VariablesReference):
 
     def __init__(self, gdbFrame, thread, argsValueReader=frame_args, localsValueReader=frame_variables):
-        super(StackFrame, self).__init__(frame_name(gdbFrame))
+        super(StackFrame, self).__init__(frame_name(gdbFrame), owner=thread)
         self.gdbFrame = gdbFrame
         self.thread = thread
+        self._registers = None
         self._scopes = [
             ScopesReference(
                 name="Args", stackFrame=self, symbolValueReader=argsValueReader
@@ -125,9 +240,14 @@ class StackFrame(VariablesReference):
         return sf
 
     def frame(self):
-        self.thread.switch()
+        selectionTracker.select_frame(self.thread, self.gdbFrame)
         return self.gdbFrame
 
+    def registers(self):
+        if self._registers is None:
+            self._registers = RegisterSnapshot(self)
+        return self._registers
+
     def scopes(self):
         res = []
         for scope in self._scopes:
@@ -155,8 +275,105 @@ def members(value):
         yield f
 
 
+class FlattenedMember:
+    """A (possibly inherited) data member of a type. `chain` is the sequence of base class fields leading
+    up to the type that declares the member. Members are read through the chain (rather than at a bit offset),
+    since the offset of a virtual base is only known at run time."""
+
+    def __init__(self, field, chain, owner):
+        self.field = field
+        self.chain = chain
+        self.owner = owner
+        self.name = field_name(field)
+        self.qualified_name = self.name
+
+    def value(self, value):
+        for base in self.chain:
+            value = value[base]
+        return value[self.field]
+
+
+def is_virtual_base(field):
+    # GDB reports no bit position for a base class whose location has to be computed, i.e. a virtual one
+    return field.is_base_class and getattr(field, "bitpos", None) is None
+
+
+def collect_flattened_members(type, chain, layout, virtualBases):
+    for field in type.fields():
+        if field.is_base_class:
+            base = field.type.strip_typedefs()
+            if is_virtual_base(field):
+                # A virtual base is shared by every path that leads to it; display it once
+                key = f"{base}"
+                if key in virtualBases:
+                    continue
+                virtualBases.add(key)
+            collect_flattened_members(base, chain + (field,), layout, virtualBases)
+        elif len(chain) > 0 and field.name is not None and field.name.startswith("_vptr"):
+            # Every layer of a polymorphic hierarchy has one; they're noise when displayed inline
+            continue
+        else:
+            layout.append(FlattenedMember(field, chain, type.name or f"{type}"))
+
+
+def unscoped_name(name):
+    """`name` without the namespaces and classes it's nested in, e.g. `Base<ns::T>` for `ns::Base<ns::T>`."""
+    depth = 0
+    start = 0
+    for i, c in enumerate(name):
+        if c == "<":
+            depth += 1
+        elif c == ">":
+            depth -= 1
+        elif depth == 0 and name.startswith("::", i):
+            start = i + 2
+    return name[start:]
+
+
+def count_names(layout):
+    counts = {}
+    for member in layout:
+        counts[member.qualified_name] = counts.get(member.qualified_name, 0) + 1
+    return counts
+
+
+def qualify_shadowed_members(layout):
+    """Members of a base class that are shadowed by some other member, must be qualified by the name of the base
+    class, which also makes their evaluateName valid (i.e. `derived.Base::member`). The base is named as it is
+    within the derived class, i.e. without its namespace, unless that's ambiguous. A base that's inherited more
+    than once (non-virtually) is qualified by the direct base it's reached through instead, since `Base::` is
+    ambiguous."""
+    names = count_names(layout)
+    for member in layout:
+        if len(member.chain) > 0 and names[member.name] > 1:
+            member.qualified_name = f"{unscoped_name(member.owner)}::{member.name}"
+    names = count_names(layout)
+    for member in layout:
+        if len(member.chain) > 0 and names[member.qualified_name] > 1:
+            member.qualified_name = f"{member.owner}::{member.name}"
+    names = count_names(layout)
+    for member in layout:
+        if len(member.chain) > 1 and names[member.qualified_name] > 1:
+            member.qualified_name = f"{member.chain[0].type.strip_typedefs()}::{member.name}"
+
+
+def flattened_members(type):
+    """Returns the members of `type` and all its base classes, as a list of `FlattenedMember`.
+    The inheritance graph of a type is traversed once and then cached."""
+    global inheritanceGraphs
+    type = type.strip_typedefs()
+    key = f"{type}"
+    layout = inheritanceGraphs.get(key)
+    if layout is None:
+        layout = []
+        collect_flattened_members(type, (), layout, set())
+        qualify_shadowed_members(layout)
+        inheritanceGraphs[key] = layout
+    return layout
+
+
 def frame_top_block(frame):
-    frame.select()
+    # Looking up blocks doesn't need `frame` to be selected; StackFrame.frame() has selected it anyway.
     block = frame.block()
     res = block
     if block is None:
@@ -222,18 +439,17 @@ def value_ui_data(name, value, evaluateName=None, format=None):
 
     varType = None
     if hasattr(value, "type") and value.type is not None:
-        varType = "{}".format(value.type)
+        varType = type_name(value.type)
 
-    return {
-        "name": name,
-        "value": f"{displayValue}",
-        "type": varType,
-        "evaluateName": evaluateName,
-        "variablesReference": 0,
-        "namedVariables": None,
-        "indexedVariables": None,
-        "memoryReference": memoryReference
-    }
+    started = time.perf_counter_ns()
+    formatted = f"{displayValue}"
+    elapsed = time.perf_counter_ns() - started
+    if elapsed > SlowFormatNs and isinstance(displayValue, gdb.Value):
+        pp = midas_utils.visualizer(displayValue)
+        if pp is not None:
+            instrumentation.record_printer(printer_budget.printer_name(pp), elapsed, 0)
+
+    return variable_row(name, formatted, varType, evaluateName, 0, memoryReference)
 
 
 # Unfortunately, the DAP-gods in their infinite wisdom, named this concept "VariablesReference"
@@ -249,6 +465,8 @@ class VariableValueReference(VariablesReference):
         self.value_cache = None
         self.addr = addr
         self.evaluateName = evaluateName
+        # Where the last page of pretty printer children ended, so that the next page continues from there
+        self.cursor = None
 
     def is_dereffable_non_primitive(self):
         return self.value_cache.type.code == gdb.TYPE_CODE_PTR and can_var_ref_type(
@@ -270,33 +488,65 @@ class VariableValueReference(VariablesReference):
 
     def ui_data(self):
         addr = hex(int(self.addr)) if self.addr is not None else None
-        evalName = self.evaluateName
-        return {
-            "name": self.name,
-            "value": f"{self.type}",
-            "type": f"{self.type.name}",
-            "evaluateName": evalName,
-            "variablesReference": self.id,
-            "namedVariables": None,
-            "indexedVariables": None,
-            "memoryReference": addr,
-        }
-
-    def pp_contents(self, pp, format, start, count):
+        row = variable_row(self.name, type_name(self.type), f"{self.type.name}", self.evaluateName, self.id, addr)
+        indexed = self.indexed_children()
+        if indexed is not None:
+            row["indexedVariables"] = indexed
+            self.indexedOnly = True
+        return row
+
+    def indexed_children(self):
+        """The number of children of a pretty printed value, if its printer knows it (i.e. has num_children).
+        Clients page through the children of such a row (see pp_contents) instead of asking for all of them at
+        once."""
+        try:
+            pp = midas_utils.visualizer(self.get_value())
+            if pp is None or not hasattr(pp, "children") or not hasattr(pp, "num_children"):
+                return None
+            return int(printer_budget.num_children(pp))
+        except Exception:
+            # Printers are user code; a failing one is reported when the children are listed
+            return None
+
+    def child_cursor(self, pp, start):
+        cursor = self.cursor
+        self.cursor = None
+        if cursor is not None and cursor.pp is pp and cursor.position == start:
+            return cursor
+        return printer_budget.ChildCursor(pp, start)
+
+    def pp_contents(self, pp, format, start, count, cursor=None):
         res = []
         if hasattr(pp, "children"):
-            for name, val in pp.children():
+            if cursor is None:
+                # A page (start, count) of the children, if the client pages through them
+                cursor = self.child_cursor(pp, start or 0)
+            for name, val in printer_budget.children(cursor, count):
+                if cancelled():
+                    break
+                if name is None:
+                    # Out of budget; the rest is served by a request of its own, which takes over the cursor.
+                    rest = None if count is None else count - len(res)
+                    more = PrinterContinuationReference(self, cursor, rest)
+                    res.append(more.ui_data())
+                    return res
+                if isinstance(val, gdb.LazyString):
+                    res.append(LazyStringReference(name, val, None).ui_data())
+                    continue
                 evalName = f"(({val.type}*){val.address})" if self.evaluateName is not None else None
                 if can_var_ref(val):
                     ref = create_eager_var_ref(name=name, value=val, evaluateName=evalName)
                     res.append(ref.ui_data())
                 else:
                     res.append(value_ui_data(name, val, evaluateName=evalName, format=format))
+            if count is not None:
+                self.cursor = cursor
         else:
-            v = pp.to_string()
-            # If to_string returns a lazy string, we want to get the actual string.
-            if hasattr(v, "value"):
-                v = v.value()
+            v = printer_budget.to_string(pp)
+            if isinstance(v, gdb.LazyString):
+                # Only read as much of the string as is displayed
+                res.append(LazyStringReference("to-string", v, "{}".format(self.type)).ui_data())
+                return res
 
             item = value_ui_data("to-string", v)
             item["type"] = "{}".format(self.type)
@@ -306,6 +556,8 @@ class VariableValueReference(VariablesReference):
     def contents_type(self, value, format, start, count):
         res = []
         for field in members(value):
+            if cancelled():
+                break
             if can_var_ref_type(field.type):
                 # since we defer creating values for the members, we calculate actual address in memory by
                 # offset of the member inside the type.ja
@@ -322,11 +574,31 @@ class VariableValueReference(VariablesReference):
                 res.append(value_ui_data(field.name, value[field], evaluateName=evalName, format=format))
         return res
 
+    def contents_flattened(self, value, format, start, count):
+        res = []
+        type = value.type.strip_typedefs()
+        if type.code == gdb.TYPE_CODE_PTR:
+            type = type.target()
+        for member in flattened_members(type):
+            if cancelled():
+                break
+            name = member.qualified_name
+            evalName = f"{self.evaluateName}.{name}" if self.evaluateName is not None else None
+            if can_var_ref_type(member.field.type):
+                # The member value is lazy; taking its address doesn't read it
+                ref = create_eager_var_ref(name, member.value(value), evalName)
+                res.append(ref.ui_data())
+            else:
+                res.append(value_ui_data(name, member.value(value), evaluateName=evalName, format=format))
+        return res
+
     def contents_array(self, value, format, start, count):
         (lo, high) = value.type.strip_typedefs().range()
         target_type = value.type.strip_typedefs().target()
         res = []
         for n in range(lo, high+1):
+            if cancelled():
+                break
             evaluateName = f"*({self.evaluateName}+{n})@1" if self.evaluateName is not None else None
             if can_var_ref_type(target_type):
                 ref = create_deferred_var_ref(target_type, n, value, None, evaluateName=evaluateName)
@@ -339,12 +611,14 @@ class VariableValueReference(VariablesReference):
     def contents(self, format=None, start=None, count=None):
         try:
             value = self.get_value()
-            pp = gdb.default_visualizer(value)
+            pp = midas_utils.visualizer(value)
             if pp is not None:
                 return self.pp_contents(pp, format, start, count)
             else:
                 if value.type.strip_typedefs().code == gdb.TYPE_CODE_ARRAY:
                     return self.contents_array(value=value, format=format, start=start, count=count)
+                elif flattenBaseClasses:
+                    return self.contents_flattened(value=value, format=format, start=start, count=count)
                 else:
                     return self.contents_type(value=value, format=format, start=start, count=count)
         except gdb.error as mem_exception:
@@ -354,38 +628,190 @@ class VariableValueReference(VariablesReference):
 
     def find_value(self, find_name):
         value = self.get_value()
-        pp = gdb.default_visualizer(value)
-        if pp is not None:
-            for name, val in pp.children():
-                if name == find_name:
-                    return val
+        if flattenBaseClasses and midas_utils.visualizer(value) is None:
+            type = value.type.strip_typedefs()
+            if type.code == gdb.TYPE_CODE_PTR:
+                type = type.target()
+            for member in flattened_members(type):
+                if member.qualified_name == find_name:
+                    return member.value(value)
         else:
-            for field in members(value):
-                if field.name == find_name:
-                    return value[field]
-        raise Exception(
+            child = midas_utils.resolve_child(value, find_name)
+            if child is not None:
+                return child
+        raise NotFound(
             f"Could not find name {find_name} in variables reference container {self.name} with id {self.id}"
         )
 
 
+class PrinterContinuationReference(VariablesReference):
+    """The children of a pretty printed value that didn't fit in the printer budget of the request that listed the
+    ones before them. Continues from that request's cursor, so no child is iterated twice. `count` is what's left
+    of the page that request asked for, if it asked for one."""
+
+    def __init__(self, valueReference, cursor, count):
+        super(PrinterContinuationReference, self).__init__("…more", owner=valueReference.owner)
+        self.valueReference = valueReference
+        self.cursor = cursor
+        self.position = cursor.position
+        self.count = count
+        # The cursor only moves forward; a repeated request (like collapsing and expanding again) gets the same
+        # rows
+        self.rows = None
+
+    def ui_data(self):
+        return variable_row(self.name, f"Children from [{self.position}] on", None, None, self.id)
+
+    def contents(self, format=None, start=None, count=None):
+        if self.rows is not None:
+            return self.rows
+        try:
+            rows = self.valueReference.pp_contents(self.cursor.pp, format, None, self.count, cursor=self.cursor)
+        except gdb.error as mem_exception:
+            return [
+                {"name": "error", "value": f"{mem_exception}", "variablesReference": 0}
+            ]
+        if not cancelled():
+            self.rows = rows
+        return rows
+
+    def find_value(self, find_name):
+        return self.valueReference.find_value(find_name)
+
+
+def string_codec(charSize, encoding):
+    if encoding is not None:
+        try:
+            return codecs.lookup(encoding).name
+        except LookupError:
+            pass
+    if charSize == 1:
+        return "utf-8"
+    endian = "le" if sys.byteorder == "little" else "be"
+    return f"utf-{charSize * 8}-{endian}"
+
+
+class LazyStringReference(VariablesReference):
+    """A gdb.LazyString. Displays a prefix of the string and, if there's more, pages in the rest when expanded, so
+    that a multi-megabyte string isn't read from the target (and sent to the client) just to show a tooltip. Each
+    page carries its memoryReference, for reading the raw bytes with `readMemory` instead."""
+
+    indexedOnly = True
+
+    def __init__(self, name, lazy, typeName):
+        super(LazyStringReference, self).__init__(name)
+        self.address = int(lazy.address)
+        # -1 if the string is null terminated; found out when it's read to the end.
+        self.length = lazy.length
+        self.typeName = typeName if typeName is not None else f"{lazy.type}"
+        self.charSize = lazy.type.strip_typedefs().target().sizeof
+        self.codec = string_codec(self.charSize, lazy.encoding)
+        # How many code units a character can continue past the first one; pages are extended to whole characters.
+        self.spill = 3 if self.codec == "utf-8" else 1 if self.codec.startswith("utf-16") else 0
+
+    def read(self, offset, count):
+        """Reads (at most) `count` characters from character `offset`. Returns the undecoded bytes."""
+        if self.length >= 0:
+            count = max(min(count, self.length - offset), 0)
+        if count == 0:
+            return b""
+        inferior = gdb.selected_inferior()
+        start = self.address + offset * self.charSize
+        if self.length >= 0:
+            data = inferior.read_memory(start, count * self.charSize).tobytes()
+        else:
+            # Read up to the terminator without crossing a memory page boundary in one read; the string may end
+            # right before unreadable memory.
+            data = b""
+            while len(data) < count * self.charSize:
+                room = MemoryPageSize - (start + len(data)) % MemoryPageSize
+                size = min(count * self.charSize - len(data), max(room - room % self.charSize, self.charSize))
+                page = inferior.read_memory(start + len(data), size).tobytes()
+                end = self.terminator(page)
+                if end is not None:
+                    data += page[:end]
+                    self.length = offset + len(data) // self.charSize
+                    break
+                data += page
+        return data
+
+    def decode(self, data):
+        return json.dumps(data.decode(self.codec, errors="replace"), ensure_ascii=False)
+
+    def continues(self, data, unit):
+        """Whether code unit `unit` of the undecoded `data` continues a character that starts before it."""
+        code = data[unit * self.charSize : (unit + 1) * self.charSize]
+        if self.codec == "utf-8":
+            return code[0] & 0xC0 == 0x80
+        if self.codec.startswith("utf-16"):
+            return 0xDC00 <= int.from_bytes(code, "big" if self.codec.endswith("be") else "little") <= 0xDFFF
+        return False
+
+    def character_boundary(self, data, unit):
+        """The first code unit from `unit` on, of the undecoded `data`, that starts a character."""
+        while (unit + 1) * self.charSize <= len(data) and self.continues(data, unit):
+            unit += 1
+        return unit
+
+    def terminator(self, data):
+        nul = bytes(self.charSize)
+        i = data.find(nul)
+        while i != -1 and i % self.charSize != 0:
+            i = data.find(nul, i + 1)
+        return i if i != -1 else None
+
+    def ui_data(self):
+        try:
+            # One more character than is displayed, to know if there's more
+            prefix = self.read(0, lazyStringPrefix + 1)
+        except gdb.error as e:
+            return variable_row(self.name, f"<{e}>", self.typeName, None, 0, hex(self.address))
+        if len(prefix) <= lazyStringPrefix * self.charSize:
+            return variable_row(self.name, self.decode(prefix), self.typeName, None, 0, hex(self.address))
+        # Cut before the character the prefix ends in the middle of, if any
+        end = lazyStringPrefix
+        while end > 0 and self.continues(prefix, end):
+            end -= 1
+        value = f"{self.decode(prefix[: end * self.charSize])}…"
+        row = variable_row(self.name, value, self.typeName, None, self.id, hex(self.address))
+        if self.length >= 0:
+            row["indexedVariables"] = -(-self.length // LazyStringPageSize)
+        return row
+
+    def contents(self, format=None, start=None, count=None):
+        page = start if start is not None else 0
+        last = page + count if count else None
+        res = []
+        while (last is None or page < last) and not cancelled():
+            offset = page * LazyStringPageSize
+            try:
+                # A character that straddles the end of the page belongs to it; the next page starts after it.
+                data = self.read(offset, LazyStringPageSize + self.spill)
+            except gdb.error as mem_exception:
+                res.append({"name": "error", "value": f"{mem_exception}", "variablesReference": 0})
+                break
+            if len(data) == 0:
+                break
+            first = self.character_boundary(data, 0) if offset > 0 else 0
+            end = self.character_boundary(data, LazyStringPageSize)
+            data = data[first * self.charSize : end * self.charSize]
+            address = hex(self.address + (offset + first) * self.charSize)
+            res.append(variable_row(f"[{offset + first}]", self.decode(data), None, None, 0, address))
+            if self.length >= 0 and offset + LazyStringPageSize >= self.length:
+                break
+            page += 1
+        return res
+
+
 def opt_out(name, type):
-    return {
-        "name": name,
-        "value": "<optimized out>",
-        "type": f"{type}",
-        "evaluateName": name,
-        "variablesReference": 0,
-        "namedVariables": None,
-        "indexedVariables": None,
-        "memoryReference": None,
-    }
+    return variable_row(name, "<optimized out>", type_name(type), name)
 
 
 # Midas defines some scopes: Args, Locals, Registers
 # TODO(simon): Add Statics, Globals
 class ScopesReference(VariablesReference):
     def __init__(self, name, stackFrame, symbolValueReader):
-        super(ScopesReference, self).__init__(name)
+        super(ScopesReference, self).__init__(name, owner=stackFrame.thread)
         self.stack_frame = stackFrame
         self.symbolValueReader = symbolValueReader
 
@@ -402,50 +828,86 @@ class ScopesReference(VariablesReference):
                 res.append(ref.ui_data())
             else:
                 address = hex(int(value.address)) if value.address is not None else None
-                res.append(
-                    {
-                        "name": name,
-                        "value": "{}".format(value),
-                        "type": f"{type}",
-                        "evaluateName": evaluateName,
-                        "variablesReference": 0,
-                        "namedVariables": None,
-                        "indexedVariables": None,
-                        "memoryReference": address,
-                    }
-                )
+                res.append(variable_row(name, "{}".format(value), type_name(type), evaluateName, 0, address))
         return res
 
     def find_value(self, find_name):
         frame = self.stack_frame.frame()
-        block = frame_top_block(frame)
-        for symbol in self.variables(block):
-            if symbol.name == find_name:
+        block = frame.block()
+        # Walk from the innermost block out to the function's top block; that covers both args and locals.
+        while block is not None and not block.is_static:
+            symbol = midas_utils.lookup_in_block(block, find_name)
+            if symbol is not None:
                 return frame.read_var(symbol, block)
-        raise Exception(
+            block = block.superblock
+        raise NotFound(
             f"Could not find name {find_name} in scope container {self.name} with id {self.id}"
         )
 
 
+def register_group(arch, group):
+    global registerGroups
+    key = (arch.name(), group)
+    names = registerGroups.get(key)
+    if names is None:
+        names = [reg.name for reg in arch.registers(group)]
+        registerGroups[key] = names
+    return names
+
+
+class RegisterSnapshot:
+    """The registers of a frame during the current stop. Each register is read (at most) once, no matter how many
+    register groups it's displayed in."""
+
+    def __init__(self, stackFrame):
+        frame = stackFrame.frame()
+        self.frame = frame
+        self.arch = frame.architecture()
+        self.values = {}
+        level = frame.level() if hasattr(frame, "level") else 0
+        self.key = (stackFrame.thread.global_num, level)
+        self.previous = previousStopRegisters.get(self.key, {})
+        self.current = currentStopRegisters.setdefault(self.key, {})
+
+    def group(self, group):
+        return register_group(self.arch, group)
+
+    def read(self, name):
+        value = self.values.get(name)
+        if value is None:
+            value = self.frame.read_register(name)
+            self.values[name] = value
+            self.current[name] = f"{value}"
+        return value
+
+    def changed(self, name):
+        previous = self.previous.get(name)
+        return previous is not None and previous != self.current.get(name)
+
+
 class RegistersReference(VariablesReference):
     def __init__(self, name, stackFrame, group):
-        super(RegistersReference, self).__init__(name)
+        super(RegistersReference, self).__init__(name, owner=stackFrame.thread)
         self.group = group
         self.stackFrame = stackFrame
 
     def contents(self, format=None, start=None, count=None):
         res = []
-        frame = self.stackFrame.frame()
-        for reg in frame.architecture().registers(self.group):
-            value = frame.read_register(reg)
+        self.stackFrame.frame()
+        snapshot = self.stackFrame.registers()
+        for name in snapshot.group(self.group):
+            value = snapshot.read(name)
             if can_var_ref(value):
-                ref = create_eager_var_ref(reg.name, value, None)
-                res.append(ref.ui_data())
+                ref = create_eager_var_ref(name, value, None)
+                item = ref.ui_data()
             else:
                 if value.type.code == gdb.TYPE_CODE_INT and format is not None and format["hex"]:
                     formattedValue = value.format_string(format="x")
                 else:
                     formattedValue = f"{value}"
-                res.append({ "name": reg.name, "value": formattedValue, "variablesReference": 0 })
+                item = { "name": name, "value": formattedValue, "variablesReference": 0 }
+            if snapshot.changed(name):
+                item["presentationHint"] = {"attributes": ["changed"]}
+            res.append(item)
 
         return res
@@ -0,0 +1,165 @@
+import gdb
+import re
+
+# Watch expressions that are plain access paths, like `foo.bar->baz[3]`, can be evaluated step by step, which lets
+# us record exactly what memory the evaluation depends on. Any other expression is always evaluated by GDB.
+rootPattern = re.compile(r"\s*([A-Za-z_]\w*)")
+accessPattern = re.compile(r"\s*(?:(\.|->)\s*([A-Za-z_]\w*)|\[\s*(\d+)\s*\])")
+
+# Don't snapshot values larger than this (in bytes). Comparing them would cost as much as re-evaluating them.
+MaxSnapshotSize = 4096
+
+
+def parse_access_path(expression):
+    """Returns (root name, [(operator, operand), ...]) if `expression` is a plain access path, otherwise None."""
+    m = rootPattern.match(expression)
+    if m is None:
+        return None
+    root = m.group(1)
+    pos = m.end()
+    path = []
+    while pos < len(expression):
+        m = accessPattern.match(expression, pos)
+        if m is None:
+            if expression[pos:].strip() == "":
+                break
+            return None
+        if m.group(3) is not None:
+            path.append(("[]", int(m.group(3))))
+        else:
+            path.append((m.group(1), m.group(2)))
+        pos = m.end()
+    return (root, path)
+
+
+def is_ref(value):
+    code = value.type.strip_typedefs().code
+    return code == gdb.TYPE_CODE_REF or code == gdb.TYPE_CODE_RVALUE_REF
+
+
+def is_ptr(value):
+    return value.type.strip_typedefs().code == gdb.TYPE_CODE_PTR
+
+
+def storage(value):
+    if value.address is None or is_ref(value):
+        raise gdb.error("Value has no (plain) storage in memory")
+    return (int(value.address), value.type.sizeof)
+
+
+def walk_access_path(frame, root_name, path):
+    """Evaluates the access path and returns (root, value, ranges) where `ranges` is every (address, size) the
+    evaluation read; the storage of each dereferenced pointer and of the resulting value."""
+    root = frame.read_var(root_name)
+    value = root
+    ranges = []
+    for (op, operand) in path:
+        if op == "[]":
+            if is_ptr(value):
+                ranges.append(storage(value))
+            elif is_ref(value):
+                raise gdb.error("References are not cached")
+            value = value[operand]
+        else:
+            # GDB, just like us, is lenient and accepts `.` on pointers
+            if is_ptr(value):
+                ranges.append(storage(value))
+                value = value.dereference()
+            elif is_ref(value):
+                raise gdb.error("References are not cached")
+            value = value[operand]
+    ranges.append(storage(value))
+    return (root, value, ranges)
+
+
+class WatchEntry:
+    def __init__(self, root, value, snapshots):
+        self.inferior = gdb.selected_inferior().num
+        self.root_address = int(root.address) if root.address is not None else None
+        self.root_type = f"{root.type}"
+        self.value = value
+        self.snapshots = snapshots
+        self.result = None
+
+    def is_valid(self, root_name):
+        try:
+            inferior = gdb.selected_inferior()
+            if inferior.num != self.inferior:
+                return False
+            # The same name may bind to something else now (another frame, another function)
+            root = gdb.selected_frame().read_var(root_name)
+            if root.address is None or int(root.address) != self.root_address or f"{root.type}" != self.root_type:
+                return False
+            for (address, snapshot) in self.snapshots:
+                if bytes(inferior.read_memory(address, len(snapshot))) != snapshot:
+                    return False
+            return True
+        except Exception:
+            return False
+
+
+class WatchCache:
+    """Caches the results of watch expressions across stops. A result is re-used as long as none of the memory the
+    expression read, has been written to. Write detection is done by diffing memory snapshots."""
+
+    def __init__(self, result_builder, can_reuse_result):
+        # result_builder(expression, value, format) -> result body of a `watch` evaluate request
+        self.result_builder = result_builder
+        # can_reuse_result(value) -> bool; whether a result can be served as-is, or must be re-built from the value
+        self.can_reuse_result = can_reuse_result
+        self.parsed = {}
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        self.uncacheable = 0
+        gdb.events.exited.connect(self.clear)
+        gdb.events.new_objfile.connect(self.clear)
+        gdb.events.clear_objfiles.connect(self.clear)
+
+    def clear(self, evt=None):
+        self.entries.clear()
+
+    def evaluate(self, expression, format):
+        if expression not in self.parsed:
+            self.parsed[expression] = parse_access_path(expression)
+        parsed = self.parsed[expression]
+        if parsed is None:
+            self.uncacheable += 1
+            return self.result_builder(expression, gdb.parse_and_eval(expression), format)
+
+        (root_name, path) = parsed
+        key = (expression, bool(format and format.get("hex")))
+        entry = self.entries.get(key)
+        if entry is not None and entry.is_valid(root_name):
+            self.hits += 1
+            if entry.result is not None:
+                return dict(entry.result)
+            return self.result_builder(expression, entry.value, format)
+
+        self.entries.pop(key, None)
+        try:
+            (root, value, ranges) = walk_access_path(gdb.selected_frame(), root_name, path)
+        except Exception:
+            self.uncacheable += 1
+            return self.result_builder(expression, gdb.parse_and_eval(expression), format)
+
+        self.misses += 1
+        result = self.result_builder(expression, value, format)
+        if sum(size for (_, size) in ranges) <= MaxSnapshotSize:
+            inferior = gdb.selected_inferior()
+            snapshots = [(address, bytes(inferior.read_memory(address, size))) for (address, size) in ranges]
+            entry = WatchEntry(root, value, snapshots)
+            if self.can_reuse_result(value):
+                entry.result = dict(result)
+            self.entries[key] = entry
+        return result
+
+    def stats(self):
+        evaluations = self.hits + self.misses + self.uncacheable
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "uncacheable": self.uncacheable,
+            "entries": len(self.entries),
+            "reuseRate": (self.hits / evaluations) if evaluations > 0 else 0.0,
+        }
@@ -84,6 +84,52 @@ def value_is_reference(type):
     return code == gdb.TYPE_CODE_PTR or code == gdb.TYPE_CODE_REF or code == gdb.TYPE_CODE_RVALUE_REF
 
 
+# Name -> symbol indexes for blocks, keyed by block_key. A block, and the symbols in it, lives as long as
+# the objfile it belongs to, so an index is built once, on first use, and then kept until objfiles are freed.
+block_indexes = {}
+
+
+def block_key(block):
+    """Identifies `block` by its function (if it's the block of one) and the ranges of it and all its superblocks.
+    Nested blocks can cover the same range (an inlined function and its outermost lexical block, for instance), but
+    not at the same depth."""
+    function = block.function
+    ranges = []
+    while block is not None:
+        ranges.append((block.start, block.end))
+        block = block.superblock
+    return (function.name if function is not None else None, tuple(ranges))
+
+
+def block_index(block):
+    global block_indexes
+    key = block_key(block)
+    index = block_indexes.get(key)
+    if index is None:
+        index = {}
+        for symbol in block:
+            # First symbol with a name wins, just like a linear scan would.
+            if symbol.name not in index:
+                index[symbol.name] = symbol
+        block_indexes[key] = index
+    return index
+
+
+def lookup_in_block(block, name):
+    return block_index(block).get(name)
+
+
+def clear_block_indexes(evt):
+    global block_indexes
+    block_indexes.clear()
+
+
+# free_objfile doesn't exist in older versions of GDB
+if hasattr(gdb.events, "free_objfile"):
+    gdb.events.free_objfile.connect(clear_block_indexes)
+gdb.events.clear_objfiles.connect(clear_block_indexes)
+
+
 # When parsing closely related blocks, this is faster than gdb.parse_and_eval on average.
 
 
@@ -121,23 +167,109 @@ def get_static(frame, name):
 # these will be found and traversed properly, anyway
 
 
+# Pretty printers and pretty printer children, resolved during the current stop. Keyed by
+# (inferior, value address, type) and (inferior, value address, type, component) respectively; forked inferiors
+# share their addresses.
+visualizers = {}
+resolved_children = {}
+
+
+def clear_resolved_values(evt):
+    global visualizers
+    global resolved_children
+    visualizers.clear()
+    resolved_children.clear()
+
+
+gdb.events.cont.connect(clear_resolved_values)
+gdb.events.memory_changed.connect(clear_resolved_values)
+
+
+def value_key(value):
+    if value.address is None:
+        return None
+    return (gdb.selected_inferior().num, int(value.address), f"{value.type}")
+
+
+def visualizer(value):
+    """Returns the pretty printer for `value`, or None. Printers are only looked up once per value & stop."""
+    global visualizers
+    key = value_key(value)
+    if key is None:
+        return gdb.default_visualizer(value)
+    if key in visualizers:
+        return visualizers[key]
+    pp = gdb.default_visualizer(value)
+    visualizers[key] = pp
+    return pp
+
+
+def index_component(component):
+    if len(component) > 2 and component[0] == "[" and component[-1] == "]":
+        component = component[1:-1]
+    if component.isdigit():
+        return int(component)
+    return None
+
+
+def find_pp_child(pp, component):
+    if not hasattr(pp, "children"):
+        return None
+    # Containers name their children [0], [1], ... [N] (or 0, 1, ... N). If the printer supports it, jump straight
+    # to the child. Printers don't necessarily bounds check children_range and child, so only if it can tell how
+    # many children there are.
+    index = index_component(component)
+    if index is not None and hasattr(pp, "num_children"):
+        try:
+            if index >= pp.num_children():
+                return None
+            if hasattr(pp, "children_range"):
+                for (name, val) in pp.children_range(index, index + 1):
+                    if name == component:
+                        return val
+            elif hasattr(pp, "child"):
+                (name, val) = pp.child(index)
+                if name == component:
+                    return val
+        except Exception:
+            pass
+    for (name, val) in pp.children():
+        if name == component:
+            return val
+    return None
+
+
+def resolve_child(value, component):
+    """Returns the child named `component` of `value` using its pretty printer if it has one, or None if
+    there's no such child."""
+    global resolved_children
+    key = value_key(value)
+    if key is not None:
+        key = key + (component,)
+        child = resolved_children.get(key)
+        if child is not None:
+            return child
+    pp = visualizer(value)
+    if pp is not None:
+        child = find_pp_child(pp, component)
+    else:
+        try:
+            child = value[component]
+        except gdb.error:
+            child = None
+    if key is not None and child is not None:
+        resolved_children[key] = child
+    return child
+
+
 def resolve_gdb_value(value, components):
     it = value
-    while len(components) > 0:
+    for component in components:
         if value_is_reference(it.type):
             it = it.referenced_value()
-        pp = gdb.default_visualizer(it)
-        component = components.pop(0)
-        if pp is not None:
-            found = False
-            for child in pp.children():
-                (name, val) = child
-                if component == name:
-                    it = val
-                    found = True
-                    break
-            if not found:
-                raise NotImplementedError()
-        else:
-            it = it[component]
+        child = resolve_child(it, component)
+        if child is None:
+            # What GDB says about a missing member; callers treat it like any other gdb.error
+            raise gdb.error(f"There is no member named {component}.")
+        it = child
     return it
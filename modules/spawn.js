@@ -21,6 +21,30 @@ class SpawnConfig {
   /** @type { string } - Path to the directory where Midas should look for DAP Pretty printers. */
   prettyPrinterPath;
 
+  /** @type {boolean} - Display members of base classes inline with the members of the derived type. */
+  flattenBaseClasses;
+
+  /** @type {boolean} - Re-use the results of watch expressions across stops, when the memory they read is unchanged. */
+  cacheWatchExpressions;
+
+  /** @type {number | undefined} - Sample the adapter's Python stack every N milliseconds, for profiling. */
+  samplingProfilerInterval;
+
+  /** @type {string | undefined} - Directory the adapter writes its latency histograms and profile to, at exit. */
+  instrumentationDirectory;
+
+  /** @type {boolean} - Keep forked processes attached, as inferiors served by the same adapter. */
+  multiInferior;
+
+  /** @type {number} - Milliseconds pretty printers get to spend per request, before their output is cut short. 0 means no limit. */
+  prettyPrinterTimeBudget;
+
+  /** @type {number} - Children pretty printers get to produce per request, before their output is cut short. 0 means no limit. */
+  prettyPrinterChildBudget;
+
+  /** @type {number} - Characters of lazy strings (like std::string) displayed before they have to be expanded. */
+  lazyStringPrefix;
+
   /**
    * @param {*} launchJson - The settings in launch.json
    */
@@ -34,6 +58,14 @@ class SpawnConfig {
     this.trace = launchJson["trace"];
     this.prettyPrinterPath = launchJson.prettyPrinterPath;
     this.ignoreStandardLibrary = launchJson["ignoreStandardLibrary"];
+    this.flattenBaseClasses = launchJson["flattenBaseClasses"] ?? false;
+    this.cacheWatchExpressions = launchJson["cacheWatchExpressions"] ?? false;
+    this.samplingProfilerInterval = launchJson["samplingProfilerInterval"];
+    this.instrumentationDirectory = launchJson["instrumentationDirectory"];
+    this.multiInferior = launchJson["multiInferior"] ?? false;
+    this.prettyPrinterTimeBudget = launchJson["prettyPrinterTimeBudget"] ?? 1000;
+    this.prettyPrinterChildBudget = launchJson["prettyPrinterChildBudget"] ?? 10000;
+    this.lazyStringPrefix = launchJson["lazyStringPrefix"] ?? 200;
   }
 
   get type() {
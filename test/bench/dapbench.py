@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""DAP benchmark harness for the GDB debug adapter (modules/python/dap-wrapper/dap.py).
+
+Replays a recorded DAP session against dap.py running under GDB, acting as the client over the same UNIX sockets
+that VSCode's side of the extension uses, and reports per-command latency percentiles, total wall time and the
+memory high-water mark of the GDB process. Reports can be compared against a baseline to catch regressions.
+
+Recording a session: start VSCode (or anything else that spawns GDB with dap.py) with the environment variable
+MIDAS_DAP_RECORD set to the path of the recording, and MIDAS_DAP_RECORD_WORKSPACE to the workspace folder.
+
+    python3 test/bench/dapbench.py replay session.jsonl --workspace test/cppworkspace --output run.json
+    python3 test/bench/dapbench.py compare baseline.json run.json
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DAP_WRAPPER = os.path.join(ROOT, "modules", "python", "dap-wrapper")
+sys.path.insert(0, DAP_WRAPPER)
+
+from recording import AdapterVariable, WorkspaceVariable, handed_out_ids, map_ids, substitute
+
+# Events that the replay waits for, before sending the requests recorded after them. Other events (thread, output,
+# breakpoint, ...) vary in number from run to run.
+SYNC_EVENTS = {"stopped", "exited", "terminated"}
+
+
+def connect(path, attempts=100, interval=0.05):
+    for _ in range(attempts):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(path)
+            return sock
+        except OSError:
+            sock.close()
+            time.sleep(interval)
+    raise TimeoutError(f"Could not connect to {path}")
+
+
+def read_messages(sock, on_message):
+    buffer = b""
+    while True:
+        data = sock.recv(65536)
+        if not data:
+            return
+        buffer += data
+        while True:
+            header_end = buffer.find(b"\r\n\r\n")
+            if header_end == -1:
+                break
+            length = int(buffer[: header_end].split(b":")[1])
+            start = header_end + 4
+            if len(buffer) < start + length:
+                break
+            on_message(json.loads(buffer[start : start + length]), length)
+            buffer = buffer[start + length :]
+
+
+def serialize(message):
+    data = json.dumps(message).encode("utf-8")
+    return b"Content-Length: " + str(len(data)).encode("ascii") + b"\r\n\r\n" + data
+
+
+class DapClient:
+    """Stand-in for the extension's side of the GDB debug adapter. Spawns GDB with dap.py and talks to it over the
+    command and event sockets."""
+
+    def __init__(self, gdb="gdb", gdb_args=(), env=None):
+        # Unique sockets per client, in the abstract namespace (see socket_path in dap.py), so that benchmarks can
+        # run in parallel.
+        name = f"midas-bench-{os.getpid()}-{os.urandom(4).hex()}"
+        env = dict(os.environ if env is None else env)
+        env["MIDAS_DAP_COMMANDS_SOCKET"] = f"@{name}-commands"
+        env["MIDAS_DAP_EVENTS_SOCKET"] = f"@{name}-events"
+        self.process = subprocess.Popen(
+            [
+                gdb,
+                *gdb_args,
+                "-q",
+                "-ex",
+                f"source {os.path.join(DAP_WRAPPER, 'variables_reference.py')}",
+                "-ex",
+                f"source {os.path.join(DAP_WRAPPER, 'dap.py')}",
+            ],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            env=env,
+        )
+        self.commands = connect(f"\0{name}-commands")
+        self.events = connect(f"\0{name}-events")
+        self.cond = threading.Condition()
+        self.responses = {}
+        self.event_counts = {}
+        self.received_events = []
+        # request seq -> payload size (bytes) of its response
+        self.response_sizes = {}
+        self.last_response_size = 0
+        self.seq = 0
+        threading.Thread(target=read_messages, args=(self.commands, self.on_message), daemon=True).start()
+        threading.Thread(target=read_messages, args=(self.events, self.on_message), daemon=True).start()
+
+    def on_message(self, message, size):
+        with self.cond:
+            if message.get("type") == "response":
+                self.responses[message["request_seq"]] = message
+                self.response_sizes[message["request_seq"]] = size
+            else:
+                self.event_counts[message["event"]] = self.event_counts.get(message["event"], 0) + 1
+                self.received_events.append(message)
+            self.cond.notify_all()
+
+    def send(self, command, arguments=None, seq=None):
+        if seq is None:
+            self.seq += 1
+            seq = self.seq
+        request = {"seq": seq, "type": "request", "command": command, "arguments": arguments or {}}
+        self.commands.sendall(serialize(request))
+        return seq
+
+    def wait_response(self, seq, timeout):
+        with self.cond:
+            if not self.cond.wait_for(lambda: seq in self.responses, timeout):
+                raise TimeoutError(f"No response to request {seq}")
+            self.last_response_size = self.response_sizes.pop(seq)
+            return self.responses.pop(seq)
+
+    def request(self, command, arguments=None, timeout=60.0):
+        """Sends a request and waits for its response. Returns (response, latency in ms)."""
+        start = time.perf_counter()
+        seq = self.send(command, arguments)
+        response = self.wait_response(seq, timeout)
+        return (response, (time.perf_counter() - start) * 1000)
+
+    def wait_event(self, event, count, timeout):
+        with self.cond:
+            if not self.cond.wait_for(lambda: self.event_counts.get(event, 0) >= count, timeout):
+                raise TimeoutError(f"Event '{event}' #{count} never arrived")
+
+    def memory_high_water_kib(self):
+        try:
+            with open(f"/proc/{self.process.pid}/status") as status:
+                for line in status:
+                    if line.startswith("VmHWM:"):
+                        return int(line.split()[1])
+        except OSError:
+            pass
+        return None
+
+    def close(self, timeout=10.0):
+        try:
+            self.process.stdin.close()
+            self.process.wait(timeout)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+
+
+class LatencyStats:
+    def __init__(self):
+        self.samples = {}
+        # Total response payload bytes and number of variables, of variables responses
+        self.variable_bytes = 0
+        self.variable_count = 0
+
+    def add(self, command, ms):
+        self.samples.setdefault(command, []).append(ms)
+
+    def add_variables(self, size, count):
+        self.variable_bytes += size
+        self.variable_count += count
+
+    def bytes_per_variable(self):
+        return self.variable_bytes / self.variable_count if self.variable_count > 0 else None
+
+    def summary(self):
+        result = {}
+        for (command, samples) in sorted(self.samples.items()):
+            ordered = sorted(samples)
+
+            def percentile(p):
+                return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+            result[command] = {
+                "count": len(ordered),
+                "meanMs": sum(ordered) / len(ordered),
+                "p50Ms": percentile(0.5),
+                "p90Ms": percentile(0.9),
+                "p99Ms": percentile(0.99),
+                "maxMs": ordered[-1],
+            }
+        return result
+
+
+def load_recording(path):
+    with open(path) as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+def replay(recording, client, workspace, program=None, timeout=60.0):
+    """Replays `recording` (see SessionRecorder in recording.py) request by request, waiting for each response and,
+    where the recorded client did, for stop events. Paths recorded relative to the workspace are resolved against
+    `workspace` and ids handed out during the recording are mapped to the ids handed out by the replay, in the
+    order they were handed out. Returns the latency stats."""
+    stats = LatencyStats()
+    expected_events = {}
+    replacements = [(WorkspaceVariable, os.path.abspath(workspace)), (AdapterVariable, DAP_WRAPPER)]
+    # recorded request seq -> the ids handed out by the response to its replay
+    replayed_ids = {}
+    # kind -> recorded id -> replayed id
+    ids = {}
+    for entry in recording:
+        if "event" in entry:
+            event = entry["event"]
+            if event in SYNC_EVENTS:
+                expected_events[event] = expected_events.get(event, 0) + 1
+                client.wait_event(event, expected_events[event], timeout)
+            continue
+        if "response" in entry:
+            recorded = entry["response"]
+            replayed = replayed_ids.pop(recorded["request_seq"], {})
+            for (kind, recorded_ids) in recorded["ids"].items():
+                ids.setdefault(kind, {}).update(zip(recorded_ids, replayed.get(kind, [])))
+            continue
+        request = entry["request"]
+        arguments = map_ids(substitute(request.get("arguments") or {}, replacements), ids)
+        if program is not None and request["command"] == "launch":
+            arguments = dict(arguments, program=program)
+        start = time.perf_counter()
+        seq = client.send(request["command"], arguments)
+        response = client.wait_response(seq, timeout)
+        stats.add(request["command"], (time.perf_counter() - start) * 1000)
+        if response.get("success"):
+            replayed_ids[request["seq"]] = handed_out_ids(request["command"], response.get("body"))
+        if request["command"] == "variables" and response.get("success"):
+            stats.add_variables(client.last_response_size, len(response["body"]["variables"]))
+    return stats
+
+
+def make_report(name, stats, wall_time_ms, client):
+    return {
+        "name": name,
+        "wallTimeMs": wall_time_ms,
+        "memory": {"gdbHighWaterKiB": client.memory_high_water_kib()},
+        "bytesPerVariable": stats.bytes_per_variable(),
+        "commands": stats.summary(),
+    }
+
+
+def print_report(report, out=sys.stdout):
+    out.write(f"{report['name']}: wall time {report['wallTimeMs']:.1f} ms, ")
+    out.write(f"GDB memory high-water {report['memory']['gdbHighWaterKiB']} KiB, ")
+    out.write(f"{report['bytesPerVariable']} bytes per variable\n")
+    out.write(f"{'command':<24}{'count':>7}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}\n")
+    for (command, s) in report["commands"].items():
+        out.write(f"{command:<24}{s['count']:>7}{s['p50Ms']:>10.2f}{s['p90Ms']:>10.2f}")
+        out.write(f"{s['p99Ms']:>10.2f}{s['maxMs']:>10.2f}\n")
+
+
+def compare(baseline, current, threshold):
+    """Prints the p50/p90 change per command. Returns True if any command's p90 regressed by more than
+    `threshold`."""
+    regressed = False
+    print(f"{'command':<24}{'p50 base':>10}{'p50 now':>10}{'p90 base':>10}{'p90 now':>10}{'p90 delta':>11}")
+    for (command, now) in current["commands"].items():
+        base = baseline["commands"].get(command)
+        if base is None:
+            print(f"{command:<24}{'-':>10}{now['p50Ms']:>10.2f}{'-':>10}{now['p90Ms']:>10.2f}{'new':>11}")
+            continue
+        delta = (now["p90Ms"] - base["p90Ms"]) / base["p90Ms"] if base["p90Ms"] > 0 else 0.0
+        flag = " !" if delta > threshold else ""
+        regressed = regressed or delta > threshold
+        print(
+            f"{command:<24}{base['p50Ms']:>10.2f}{now['p50Ms']:>10.2f}{base['p90Ms']:>10.2f}{now['p90Ms']:>10.2f}"
+            f"{delta * 100:>10.1f}%{flag}"
+        )
+    print(f"wall time: {baseline['wallTimeMs']:.1f} ms -> {current['wallTimeMs']:.1f} ms")
+    print(
+        f"GDB memory high-water: {baseline['memory']['gdbHighWaterKiB']} KiB -> "
+        f"{current['memory']['gdbHighWaterKiB']} KiB"
+    )
+    print(f"bytes per variable: {baseline.get('bytesPerVariable')} -> {current.get('bytesPerVariable')}")
+    return regressed
+
+
+def write_report(report, path):
+    if path is not None:
+        with open(path, "w") as file:
+            json.dump(report, file, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="mode", required=True)
+
+    rep = sub.add_parser("replay", help="Replay a recorded session")
+    rep.add_argument("recording")
+    rep.add_argument("--workspace", default=".", help="The workspace folder to resolve recorded paths against")
+    rep.add_argument("--program", help="Replace the program of the recorded launch request")
+    rep.add_argument("--gdb", default="gdb")
+    rep.add_argument("--timeout", type=float, default=60.0, help="Seconds to wait for any one response or event")
+    rep.add_argument("--output", help="Write the report (JSON) here")
+
+    cmp = sub.add_parser("compare", help="Compare a report against a baseline report")
+    cmp.add_argument("baseline")
+    cmp.add_argument("current")
+    cmp.add_argument("--threshold", type=float, default=0.2, help="Allowed p90 regression (0.2 = 20%%)")
+
+    args = parser.parse_args()
+    if args.mode == "compare":
+        with open(args.baseline) as b, open(args.current) as c:
+            sys.exit(1 if compare(json.load(b), json.load(c), args.threshold) else 0)
+
+    recording = load_recording(args.recording)
+    client = DapClient(gdb=args.gdb)
+    try:
+        start = time.perf_counter()
+        stats = replay(recording, client, args.workspace, program=args.program, timeout=args.timeout)
+        wall_time_ms = (time.perf_counter() - start) * 1000
+        report = make_report(os.path.basename(args.recording), stats, wall_time_ms, client)
+    finally:
+        client.close()
+    print_report(report)
+    write_report(report, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""Microbenchmark of the adapter's response serialization (modules/python/dap-wrapper/serialization.py) on large
+`variables` bodies, against the json.dumps + str framing it replaced. Runs outside of GDB:
+
+    python3 test/bench/serialization_bench.py --rows 100000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+repositoryRoot = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(repositoryRoot, "modules", "python", "dap-wrapper"))
+
+import serialization
+
+
+def variables_body(rows, compact):
+    """Rows as they're produced by variables_reference.py. `compact` leaves out unset optional fields, like
+    variable_row does; otherwise they're sent as null, as they used to be."""
+    variables = []
+    for i in range(rows):
+        if i % 3 == 0:
+            row = {
+                "name": f"[{i}]",
+                "value": "{...}",
+                "type": "std::pair<const std::__cxx11::basic_string<char>, std::vector<int> >",
+                "evaluateName": f"*(m+{i})@1",
+                "variablesReference": 1000 + i,
+                "namedVariables": None,
+                "indexedVariables": None,
+                "memoryReference": hex(0x7FFFFFFFD000 + i * 32),
+            }
+        else:
+            row = {
+                "name": f"[{i}]",
+                "value": f"{i * 7}",
+                "type": "int",
+                "evaluateName": None,
+                "variablesReference": 0,
+                "namedVariables": None,
+                "indexedVariables": None,
+                "memoryReference": None,
+            }
+        if compact:
+            row = {key: value for (key, value) in row.items() if value is not None}
+        variables.append(row)
+    return {"variables": variables}
+
+
+def legacy_response(seq, request_seq, success, command, message=None, body=None):
+    payload = json.dumps(
+        {
+            "type": "response",
+            "seq": seq,
+            "request_seq": request_seq,
+            "success": success,
+            "command": command,
+            "message": message,
+            "body": body,
+        }
+    )
+    return bytes(f"Content-Length: {len(payload)}\r\n\r\n{payload}", "utf-8")
+
+
+def stdlib_response(seq, request_seq, success, command, message=None, body=None):
+    return serialization.frame(serialization.stdlib_dumps(body))
+
+
+def measure(name, fn, body, rows, repeat):
+    best = None
+    size = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        size = len(fn(0, 1, True, "variables", None, body))
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print(
+        f"{name:<10}{best * 1000:>10.2f} ms{size / best / 1e6:>10.1f} MB/s{rows / best / 1e6:>10.2f} M rows/s"
+        f"{size / rows:>10.1f} B/row"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"{args.rows} rows, best of {args.repeat}; serialization backend: {serialization.Backend}")
+    for compact in (False, True):
+        body = variables_body(args.rows, compact)
+        print("compact rows:" if compact else "rows with null fields:")
+        measure("legacy", legacy_response, body, args.rows, args.repeat)
+        measure("stdlib", stdlib_response, body, args.rows, args.repeat)
+        measure("current", serialization.response, body, args.rows, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""Scripted drivers for the stress programs in test/cppworkspace/stress.
+
+Every scenario launches its program under dap.py, runs to `stress_break` and then exercises stackTrace, scopes,
+variables, threads and disassemble the way a client would, recording the latency of every request. The reports
+have the same format as dapbench.py's, so a run can be saved as a baseline and later runs compared against it:
+
+    python3 test/bench/stress.py --output-dir baseline
+    python3 test/bench/stress.py --output-dir current
+    python3 test/bench/stress.py --compare-dir baseline --output-dir current
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+from dapbench import DapClient, LatencyStats, ROOT, compare, make_report, print_report, write_report
+
+BIN = os.path.join(ROOT, "test", "cppworkspace", "bin")
+
+# Frames per stackTrace request, like VSCode's paging.
+StackPageSize = 20
+# Children per variables request, when paging through containers.
+ChildPageSize = 100
+
+# The printer budget the extension uses by default (see prettyPrinterTimeBudget and prettyPrinterChildBudget)
+PrinterTimeBudget = 1000
+PrinterChildBudget = 10000
+
+
+class Driver:
+    def __init__(self, client, stats, timeout, printer_budget):
+        self.client = client
+        self.stats = stats
+        self.timeout = timeout
+        self.printer_budget = printer_budget
+        self.thread_id = None
+
+    def request(self, command, arguments=None):
+        (response, ms) = self.client.request(command, arguments, timeout=self.timeout)
+        self.stats.add(command, ms)
+        if not response.get("success"):
+            raise Exception(f"{command} failed: {response.get('message')}")
+        return response.get("body") or {}
+
+    def launch(self, program, args):
+        (time_budget, child_budget) = self.printer_budget
+        self.request(
+            "initialize",
+            {
+                "adapterID": "midas-gdb",
+                "prettyPrinterTimeBudget": time_budget,
+                "prettyPrinterChildBudget": child_budget,
+            },
+        )
+        self.request("launch", {"program": program, "args": args})
+        self.request("setFunctionBreakpoints", {"breakpoints": [{"name": "stress_break"}]})
+        self.request("configurationDone")
+        self.client.wait_event("stopped", 1, self.timeout)
+        stopped = [evt for evt in self.client.received_events if evt["event"] == "stopped"][0]
+        self.thread_id = stopped["body"]["threadId"]
+
+    def stack_trace(self, thread_id=None, start=0, levels=StackPageSize):
+        body = self.request(
+            "stackTrace", {"threadId": thread_id or self.thread_id, "startFrame": start, "levels": levels}
+        )
+        return body["stackFrames"]
+
+    def variables(self, reference, start=None, count=None):
+        args = {"variablesReference": reference}
+        if start is not None:
+            args.update(start=start, count=count)
+        variables = self.request("variables", args)["variables"]
+        self.stats.add_variables(self.client.last_response_size, len(variables))
+        return variables
+
+    def locals_of(self, frame):
+        scopes = self.request("scopes", {"frameId": frame["id"]})["scopes"]
+        return self.variables(scopes[0]["variablesReference"])
+
+    def caller_locals(self):
+        """The locals of the function that called stress_break, after disassembling around the stop."""
+        frames = self.stack_trace()
+        self.disassemble(frames[0])
+        return self.locals_of(frames[1])
+
+    def expand(self, variables, name):
+        for var in variables:
+            if var["name"] == name:
+                return self.variables(var["variablesReference"])
+        raise Exception(f"No variable named {name}")
+
+    def disassemble(self, frame, count=400):
+        self.request(
+            "disassemble",
+            {
+                "memoryReference": frame["instructionPointerReference"],
+                "instructionOffset": -count // 2,
+                "instructionCount": count,
+            },
+        )
+
+    def disconnect(self):
+        self.request("disconnect", {"terminateDebuggee": True})
+
+
+def deep_stack(driver, scale):
+    depth = max(1, int(10_000 * scale))
+    driver.launch(os.path.join(BIN, "deep_stack"), [str(depth)])
+    frames = []
+    while True:
+        page = driver.stack_trace(start=len(frames))
+        frames += page
+        if len(page) < StackPageSize:
+            break
+    for frame in frames[:: max(1, len(frames) // 50)]:
+        driver.locals_of(frame)
+    driver.disassemble(frames[0])
+    driver.request("threads")
+
+
+def huge_containers(driver, scale):
+    count = max(1, int(10_000_000 * scale))
+    driver.launch(os.path.join(BIN, "huge_containers"), [str(count)])
+    locals = driver.caller_locals()
+    for name in ("ints", "points", "squares"):
+        reference = next(var["variablesReference"] for var in locals if var["name"] == name)
+        # First page, a page in the middle and the last page, the way a user scrolls.
+        for start in (0, count // 2, max(0, count - ChildPageSize)):
+            driver.variables(reference, start, ChildPageSize)
+    driver.expand(locals, "strings")
+    driver.request("threads")
+
+
+def many_threads(driver, scale):
+    count = max(1, int(2_000 * scale))
+    driver.launch(os.path.join(BIN, "many_threads"), [str(count)])
+    threads = driver.request("threads")["threads"]
+    for _ in range(4):
+        driver.request("threads")
+    for thread in threads[:: max(1, len(threads) // 50)]:
+        frames = driver.stack_trace(thread_id=thread["id"])
+        driver.locals_of(frames[0])
+    driver.disassemble(driver.stack_trace()[0])
+
+
+def wide_struct(driver, scale):
+    driver.launch(os.path.join(BIN, "wide_struct"), [])
+    locals = driver.caller_locals()
+    driver.expand(locals, "wide")
+    driver.expand(locals, "pointer")
+    driver.request("threads")
+
+
+def deep_inheritance(driver, scale):
+    driver.launch(os.path.join(BIN, "deep_inheritance"), [])
+    locals = driver.caller_locals()
+    for name in ("diamond", "deepest", "polymorphic"):
+        children = driver.expand(locals, name)
+        # Walk down the base class chain
+        while True:
+            bases = [var for var in children if var["variablesReference"] != 0 and var["name"].startswith("Base")]
+            if len(bases) == 0:
+                break
+            children = driver.variables(bases[0]["variablesReference"])
+    driver.request("threads")
+
+
+Scenarios = {
+    "deep_stack": deep_stack,
+    "huge_containers": huge_containers,
+    "many_threads": many_threads,
+    "wide_struct": wide_struct,
+    "deep_inheritance": deep_inheritance,
+}
+
+
+def run(name, scale, gdb, timeout, printer_budget):
+    stats = LatencyStats()
+    client = DapClient(gdb=gdb)
+    try:
+        driver = Driver(client, stats, timeout, printer_budget)
+        start = time.perf_counter()
+        Scenarios[name](driver, scale)
+        wall_time_ms = (time.perf_counter() - start) * 1000
+        report = make_report(name, stats, wall_time_ms, client)
+        driver.disconnect()
+    finally:
+        client.close()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("scenarios", nargs="*", help=f"Any of {', '.join(Scenarios)}. Default: all of them")
+    parser.add_argument("--scale", type=float, default=1.0, help="Scale the sizes of the stress programs")
+    parser.add_argument("--gdb", default="gdb")
+    parser.add_argument(
+        "--timeout", type=float, default=600.0, help="Seconds to wait for any one response or event"
+    )
+    parser.add_argument("--output-dir", help="Write a report per scenario (JSON) here")
+    parser.add_argument("--compare-dir", help="Compare against the reports in this directory")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed p90 regression (0.2 = 20%%)")
+    parser.add_argument(
+        "--printer-time-budget",
+        type=float,
+        default=PrinterTimeBudget,
+        help="Pretty printer ms per request (0: no limit)",
+    )
+    parser.add_argument(
+        "--printer-child-budget",
+        type=int,
+        default=PrinterChildBudget,
+        help="Pretty printer children per request (0: no limit)",
+    )
+    args = parser.parse_args()
+
+    for name in args.scenarios:
+        if name not in Scenarios:
+            parser.error(f"Unknown scenario {name}")
+    if args.output_dir is not None:
+        os.makedirs(args.output_dir, exist_ok=True)
+    regressed = False
+    for name in args.scenarios or Scenarios:
+        budget = (args.printer_time_budget, args.printer_child_budget)
+        report = run(name, args.scale, args.gdb, args.timeout, budget)
+        print_report(report)
+        if args.output_dir is not None:
+            write_report(report, os.path.join(args.output_dir, f"{name}.json"))
+        if args.compare_dir is not None:
+            with open(os.path.join(args.compare_dir, f"{name}.json")) as file:
+                regressed = compare(json.load(file), report, args.threshold) or regressed
+    sys.exit(1 if regressed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""Generates the sources of the stress programs that are too large to write by hand.
+
+    generate.py <output directory> [field count] [inheritance depth]
+"""
+import os
+import sys
+
+FieldCount = 5000
+InheritanceDepth = 256
+
+
+def wide_struct(fields):
+    lines = [
+        '#include "stress.hpp"',
+        "",
+        f"// A struct with {fields} fields, for variables on very wide types.",
+        "struct Wide {",
+    ]
+    types = ("int", "double", "char", "long")
+    for i in range(fields):
+        lines.append(f"  {types[i % len(types)]} field_{i};")
+    lines += ["};", "", "int main() {", "  Wide wide{};"]
+    for i in range(0, fields, 97):
+        lines.append(f"  wide.field_{i} = {i % 128};")
+    lines += ["  Wide* pointer = &wide;", "  stress_break();", "  return pointer->field_0;", "}", ""]
+    return "\n".join(lines)
+
+
+def deep_inheritance(depth):
+    lines = [
+        '#include "stress.hpp"',
+        "",
+        f"// A {depth} level deep single inheritance chain plus a diamond at the bottom, for base class "
+        "expansion.",
+        "struct Base0 {",
+        "  virtual ~Base0() = default;",
+        "  int member_0 = 0;",
+        "};",
+    ]
+    for i in range(1, depth):
+        lines += [
+            f"struct Base{i} : Base{i - 1} {{",
+            f"  int member_{i} = {i};",
+            f"  double shadowed = {i}.5;",
+            "};",
+        ]
+    last = depth - 1
+    lines += [
+        f"struct Left : virtual Base{last} {{",
+        "  int left = 1;",
+        "};",
+        f"struct Right : virtual Base{last} {{",
+        "  int right = 2;",
+        "};",
+        "struct Diamond : Left, Right {",
+        "  int diamond = 3;",
+        "};",
+        "",
+        "int main() {",
+        "  Diamond diamond;",
+        f"  Base{last} deepest;",
+        "  Base0* polymorphic = &deepest;",
+        "  stress_break();",
+        "  return diamond.diamond + polymorphic->member_0;",
+        "}",
+        "",
+    ]
+    return "\n".join(lines)
+
+
+def write(directory, name, contents):
+    path = os.path.join(directory, name)
+    # Don't touch the file if nothing changed, so it isn't needlessly recompiled
+    if os.path.exists(path):
+        with open(path) as file:
+            if file.read() == contents:
+                return
+    with open(path, "w") as file:
+        file.write(contents)
+
+
+def main():
+    directory = sys.argv[1]
+    fields = int(sys.argv[2]) if len(sys.argv) > 2 else FieldCount
+    depth = int(sys.argv[3]) if len(sys.argv) > 3 else InheritanceDepth
+    os.makedirs(directory, exist_ok=True)
+    write(directory, "wide_struct.cpp", wide_struct(fields))
+    write(directory, "deep_inheritance.cpp", deep_inheritance(depth))
+
+
+if __name__ == "__main__":
+    main()
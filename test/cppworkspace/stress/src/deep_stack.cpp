@@ -0,0 +1,22 @@
+// Recurses N (default 10,000) frames deep and stops at the bottom, for stackTrace paging.
+#include "stress.hpp"
+
+struct Frame {
+  long depth;
+  long accumulated;
+  double ratio;
+};
+
+__attribute__((noinline)) long recurse(long depth, long max, Frame parent) {
+  Frame frame{depth, parent.accumulated + depth, static_cast<double>(depth) / max};
+  if (depth == max) {
+    stress_break();
+    return frame.accumulated;
+  }
+  return recurse(depth + 1, max, frame) + 1;
+}
+
+int main(int argc, const char** argv) {
+  const auto depth = size_arg(argc, argv, 10'000);
+  return static_cast<int>(recurse(1, depth, Frame{0, 0, 0.0}) & 0x7f);
+}
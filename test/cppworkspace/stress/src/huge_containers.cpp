@@ -0,0 +1,33 @@
+// std::vector and std::map with N (default 10^7) elements each, for paging through pretty printer children.
+#include "stress.hpp"
+#include <cstdint>
+#include <map>
+#include <string>
+#include <vector>
+
+struct Point {
+  int x;
+  int y;
+};
+
+int main(int argc, const char** argv) {
+  const auto count = size_arg(argc, argv, 10'000'000);
+  std::vector<int> ints;
+  ints.reserve(count);
+  for (auto i = 0; i < count; ++i) {
+    ints.push_back(i);
+  }
+  std::vector<Point> points;
+  points.reserve(count);
+  for (auto i = 0; i < count; ++i) {
+    points.push_back(Point{i, -i});
+  }
+  // Squares of up to 10^7 don't fit an int
+  std::map<int, std::int64_t> squares;
+  for (auto i = 0; i < count; ++i) {
+    squares.emplace_hint(squares.end(), i, std::int64_t{i} * i);
+  }
+  std::vector<std::string> strings(1000, std::string(64, 'x'));
+  stress_break();
+  return static_cast<int>(ints.size() + points.size() + squares.size() + strings.size()) & 0x7f;
+}
@@ -0,0 +1,53 @@
+// Starts N (default 2,000) threads that all stay alive, and stops once every one of them is running, for the threads
+// request and thread switching.
+#include "stress.hpp"
+#include <condition_variable>
+#include <mutex>
+#include <pthread.h>
+#include <vector>
+
+static std::mutex mutex;
+static std::condition_variable changed;
+static long started = 0;
+static bool done = false;
+
+__attribute__((noinline)) void wait_for_exit(long id) {
+  volatile long local_id = id;
+  std::unique_lock lock{mutex};
+  started++;
+  changed.notify_all();
+  changed.wait(lock, [] { return done; });
+  (void)local_id;
+}
+
+void* worker(void* arg) {
+  wait_for_exit(reinterpret_cast<long>(arg));
+  return nullptr;
+}
+
+int main(int argc, const char** argv) {
+  const auto count = size_arg(argc, argv, 2'000);
+  std::vector<pthread_t> threads(count);
+  pthread_attr_t attr;
+  pthread_attr_init(&attr);
+  // 2,000 threads with the default 8MB stacks would reserve 16GB of address space
+  pthread_attr_setstacksize(&attr, 64 * 1024);
+  for (long i = 0; i < count; ++i) {
+    pthread_create(&threads[i], &attr, worker, reinterpret_cast<void*>(i));
+  }
+  {
+    std::unique_lock lock{mutex};
+    changed.wait(lock, [count] { return started == count; });
+  }
+  stress_break();
+  {
+    std::lock_guard lock{mutex};
+    done = true;
+  }
+  changed.notify_all();
+  for (auto& t : threads) {
+    pthread_join(t, nullptr);
+  }
+  pthread_attr_destroy(&attr);
+  return 0;
+}
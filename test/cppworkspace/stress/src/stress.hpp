@@ -0,0 +1,14 @@
+#pragma once
+#include <cstdlib>
+
+// The stress drivers (test/bench/stress.py) set a function breakpoint on this. Every stress program calls it once
+// everything it wants to inspect is live.
+extern "C" __attribute__((noinline)) void stress_break() { asm volatile(""); }
+
+// Size parameters can be overridden by the first command line argument, so the drivers can scale the programs down.
+inline long size_arg(int argc, const char** argv, long fallback) {
+  if (argc > 1) {
+    return std::strtol(argv[1], nullptr, 10);
+  }
+  return fallback;
+}
@@ -8,6 +8,8 @@
 #include "testcase_namespaces/structrequests.hpp"
 #include "testcase_namespaces/test_freefloating_watch.hpp"
 #include "testcase_namespaces/test_ptrs.hpp"
+#include "testcase_namespaces/virtualbases.hpp"
+#include "testcase_namespaces/lazystrings.hpp"
 #include <cstdint>
 #include <iostream>
 #include <iterator>
@@ -298,6 +300,8 @@ int main(int argc, const char **argv) {
   enum_stuff();
   derive::main();
   baseclasses::main();
+  virtualbases::main();
+  lazystrings::main();
   longstack::main();
   statics::main();
   structsrequests::main();
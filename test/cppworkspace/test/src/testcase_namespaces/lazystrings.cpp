@@ -0,0 +1,15 @@
+#include "lazystrings.hpp"
+#include <cstdio>
+
+namespace lazystrings
+{
+    void inspect(const std::string& text) {
+        std::printf("%zu\n", text.size());
+    }
+
+    void main() {
+        // Longer than a page of a lazy string (4096 bytes), with a two byte character straddling the first page boundary
+        std::string text = std::string(4095, 'a') + "é" + std::string(5000, 'b');
+        inspect(text);
+    }
+} // namespace lazystrings
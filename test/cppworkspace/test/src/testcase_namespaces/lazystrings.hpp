@@ -0,0 +1,7 @@
+#pragma once
+#include <string>
+
+namespace lazystrings {
+    void inspect(const std::string& text);
+    void main();
+}
@@ -0,0 +1,14 @@
+#include "virtualbases.hpp"
+#include <cstdio>
+
+namespace virtualbases
+{
+    void inspect(Diamond& diamond) {
+        std::printf("%d\n", diamond.diamond_value);
+    }
+
+    void main() {
+        Diamond diamond{10};
+        inspect(diamond);
+    }
+} // namespace virtualbases
@@ -0,0 +1,27 @@
+#pragma once
+
+namespace virtualbases {
+    struct Shared {
+            Shared(int i) : shared_value(i) { }
+            int shared_value;
+    };
+
+    struct Left : public virtual Shared {
+            Left(int i) : Shared(i), side_value(i + 1) { }
+            int side_value;
+    };
+
+    struct Right : public virtual Shared {
+            Right(int i) : Shared(i), side_value(i + 2) { }
+            int side_value;
+    };
+
+    // Shared is a virtual base of both Left and Right; there's one Shared subobject in a Diamond.
+    struct Diamond : public Left, public Right {
+            Diamond(int i) : Shared(i), Left(i), Right(i), diamond_value(i + 3) { }
+            int diamond_value;
+    };
+
+    void inspect(Diamond& diamond);
+    void main();
+}
@@ -0,0 +1,82 @@
+"""Tests of the adapter's instrumentation. instrumentation.py doesn't depend on GDB, so these run with plain
+Python:
+
+    python3 -m pytest test/python
+"""
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "modules", "python", "dap-wrapper"))
+
+from instrumentation import EXECUTE, QUEUE, Instrumentation
+
+
+class WriteFilesTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def test_writes_nothing_unless_configured(self):
+        instrumentation = Instrumentation()
+        instrumentation.configure_output(None, None)
+        instrumentation.record("variables", EXECUTE, 1000)
+        instrumentation.write_files()
+        self.assertIsNone(instrumentation.directory)
+
+    def test_profiling_defaults_to_the_temporary_directory(self):
+        instrumentation = Instrumentation()
+        instrumentation.configure_output(None, 5)
+        self.assertEqual(instrumentation.directory, tempfile.gettempdir())
+
+    def test_writes_histograms_named_after_the_pid(self):
+        output = os.path.join(self.directory.name, "nested")
+        instrumentation = Instrumentation()
+        instrumentation.configure_output(output, None)
+        instrumentation.record("variables", EXECUTE, 1000)
+        instrumentation.write_files()
+        self.assertEqual(os.listdir(output), [f"latency-histograms-{os.getpid()}.json"])
+        with open(os.path.join(output, f"latency-histograms-{os.getpid()}.json")) as file:
+            dump = json.load(file)
+        self.assertEqual(dump["commands"]["variables"]["execute"]["count"], 1)
+
+    def test_reports_failures(self):
+        blocker = os.path.join(self.directory.name, "file")
+        open(blocker, "w").close()
+        instrumentation = Instrumentation()
+        # A directory can't be created where a file is
+        instrumentation.configure_output(os.path.join(blocker, "directory"), None)
+        stderr = sys.stderr
+        sys.stderr = captured = io.StringIO()
+        try:
+            instrumentation.write_files()
+        finally:
+            sys.stderr = stderr
+        self.assertIn("Failed to write instrumentation", captured.getvalue())
+
+
+class HistogramsTest(unittest.TestCase):
+    def test_concurrent_first_records_are_all_kept(self):
+        for _ in range(50):
+            instrumentation = Instrumentation()
+            barrier = threading.Barrier(2)
+
+            def record(stage):
+                barrier.wait()
+                instrumentation.record("evaluate", stage, 1000)
+
+            threads = [threading.Thread(target=record, args=(stage,)) for stage in (QUEUE, EXECUTE)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            hists = instrumentation.histograms("evaluate")
+            self.assertEqual((hists[QUEUE].count, hists[EXECUTE].count), (1, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
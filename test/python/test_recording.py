@@ -0,0 +1,83 @@
+"""Tests of recording sessions for the benchmark harness. recording.py doesn't depend on GDB, so these run with
+plain Python:
+
+    python3 -m pytest test/python
+"""
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "modules", "python", "dap-wrapper"))
+
+from recording import AdapterVariable, SessionRecorder, WorkspaceVariable, handed_out_ids, map_ids, substitute
+
+
+class SubstituteTest(unittest.TestCase):
+    def test_replaces_path_prefixes(self):
+        arguments = {
+            "program": "/home/me/project/bin/app",
+            "source": {"path": "/home/me/project/src/main.cpp"},
+            "rrinit": "/opt/ext/python/dap-wrapper/rrinit",
+            "args": ["/home/me/project", "/home/me/projects/other"],
+        }
+        replacements = [("/home/me/project", WorkspaceVariable), ("/opt/ext/python/dap-wrapper", AdapterVariable)]
+        self.assertEqual(
+            substitute(arguments, replacements),
+            {
+                "program": "${workspaceFolder}/bin/app",
+                "source": {"path": "${workspaceFolder}/src/main.cpp"},
+                "rrinit": "${adapterDirectory}/rrinit",
+                "args": ["${workspaceFolder}", "/home/me/projects/other"],
+            },
+        )
+
+    def test_round_trips(self):
+        arguments = {"source": {"path": "/a/b/c.cpp"}, "line": 10}
+        recorded = substitute(arguments, [("/a", WorkspaceVariable)])
+        replayed = substitute(recorded, [(WorkspaceVariable, "/x/y")])
+        self.assertEqual(replayed, {"source": {"path": "/x/y/b/c.cpp"}, "line": 10})
+
+
+class IdsTest(unittest.TestCase):
+    def test_handed_out_ids(self):
+        self.assertEqual(handed_out_ids("threads", {"threads": [{"id": 1}, {"id": 3}]}), {"thread": [1, 3]})
+        self.assertEqual(handed_out_ids("stackTrace", {"stackFrames": [{"id": 7}]}), {"frame": [7]})
+        self.assertEqual(
+            handed_out_ids("variables", {"variables": [{"variablesReference": 0}, {"variablesReference": 12}]}),
+            {"reference": [0, 12]},
+        )
+        self.assertEqual(handed_out_ids("next", None), {})
+
+    def test_map_ids(self):
+        ids = {"frame": {7: 70}, "reference": {12: 120}}
+        arguments = {"frameId": 7, "requests": [{"variablesReference": 12}, {"variablesReference": 5}], "line": 7}
+        self.assertEqual(
+            map_ids(arguments, ids),
+            {"frameId": 70, "requests": [{"variablesReference": 120}, {"variablesReference": 5}], "line": 7},
+        )
+
+
+class SessionRecorderTest(unittest.TestCase):
+    def test_records_relative_paths_and_ids(self):
+        with tempfile.TemporaryDirectory() as directory:
+            file_path = os.path.join(directory, "session.jsonl")
+            recorder = SessionRecorder(file_path, "/home/me/project", "/opt/ext/python/dap-wrapper")
+            launch = {"seq": 1, "command": "launch", "arguments": {"program": "/home/me/project/app"}}
+            recorder.record_request(launch)
+            recorder.record_response(2, "stackTrace", True, {"stackFrames": [{"id": 4}]})
+            recorder.record_response(3, "next", True, None)
+            recorder.record("event", "stopped")
+            recorder.file.close()
+            with open(file_path) as file:
+                entries = [json.loads(line) for line in file]
+        self.assertEqual(entries[0]["request"]["arguments"], {"program": "${workspaceFolder}/app"})
+        self.assertEqual(
+            entries[1]["response"], {"request_seq": 2, "command": "stackTrace", "ids": {"frame": [4]}}
+        )
+        self.assertEqual(entries[2]["event"], "stopped")
+
+
+if __name__ == "__main__":
+    unittest.main()
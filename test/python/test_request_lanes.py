@@ -0,0 +1,142 @@
+"""Tests of the adapter's request queue. request_lanes.py doesn't depend on GDB, so these run with plain Python:
+
+    python3 -m pytest test/python
+"""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "modules", "python", "dap-wrapper"))
+
+from cancellation import CancellationToken
+from request_lanes import RequestLanes
+
+
+class Lanes:
+    """RequestLanes, with requests pushed by command name."""
+
+    def __init__(self):
+        self.lanes = RequestLanes()
+        self.seq = 0
+        self.tokens = {}
+
+    def push(self, command, args=None):
+        self.seq += 1
+        token = CancellationToken()
+        self.tokens[self.seq] = token
+        self.lanes.push(self.seq, command, args, 0, token)
+        return self.seq
+
+    def drain(self):
+        commands = []
+        while True:
+            entry = self.lanes.pop()
+            if entry is None:
+                return commands
+            commands.append(entry.command)
+            self.lanes.done()
+
+
+class LaneOrderTest(unittest.TestCase):
+    def test_keeps_order_of_ordered_requests(self):
+        lanes = Lanes()
+        for command in ("setBreakpoints", "setFunctionBreakpoints", "configurationDone"):
+            lanes.push(command)
+        self.assertEqual(lanes.drain(), ["setBreakpoints", "setFunctionBreakpoints", "configurationDone"])
+
+    def test_keeps_order_of_inspection_requests(self):
+        lanes = Lanes()
+        lanes.push("stackTrace")
+        lanes.push("scopes")
+        lanes.push("variables")
+        self.assertEqual(lanes.drain(), ["stackTrace", "scopes", "variables"])
+
+    def test_interleaves_ordered_and_inspection_requests_by_arrival(self):
+        lanes = Lanes()
+        lanes.push("stackTrace")
+        lanes.push("setBreakpoints")
+        lanes.push("variables")
+        self.assertEqual(lanes.drain(), ["stackTrace", "setBreakpoints", "variables"])
+
+    def test_pause_is_served_before_everything_queued_ahead_of_it(self):
+        lanes = Lanes()
+        lanes.push("stackTrace")
+        lanes.push("setBreakpoints")
+        lanes.push("setBreakpoints")
+        lanes.push("variables")
+        lanes.push("pause")
+        self.assertEqual(lanes.drain(), ["pause", "stackTrace", "setBreakpoints", "setBreakpoints", "variables"])
+
+    def test_continue_jumps_inspection_requests_but_not_ordered_ones(self):
+        lanes = Lanes()
+        lanes.push("setBreakpoints")
+        lanes.push("stackTrace")
+        lanes.push("continue")
+        lanes.push("variables")
+        self.assertEqual(lanes.drain(), ["setBreakpoints", "continue", "stackTrace", "variables"])
+
+    def test_repl_evaluate_is_kept_in_order(self):
+        lanes = Lanes()
+        lanes.push("setBreakpoints")
+        lanes.push("evaluate", {"expression": "info threads", "context": "repl"})
+        lanes.push("continue")
+        self.assertEqual(lanes.drain(), ["setBreakpoints", "evaluate", "continue"])
+
+    def test_empty(self):
+        self.assertIsNone(RequestLanes().pop())
+
+
+class CancellationTest(unittest.TestCase):
+    def test_resume_cancels_queued_inspection_requests(self):
+        lanes = Lanes()
+        stack = lanes.push("stackTrace")
+        breakpoints = lanes.push("setBreakpoints")
+        lanes.push("next")
+        self.assertTrue(lanes.tokens[stack].cancelled)
+        self.assertFalse(lanes.tokens[breakpoints].cancelled)
+
+    def test_resume_cancels_the_executing_inspection_request(self):
+        lanes = Lanes()
+        variables = lanes.push("variables", {"variablesReference": 1})
+        lanes.lanes.pop()
+        lanes.push("continue")
+        self.assertTrue(lanes.tokens[variables].cancelled)
+
+    def test_pause_cancels_nothing(self):
+        lanes = Lanes()
+        stack = lanes.push("stackTrace")
+        lanes.push("pause")
+        self.assertFalse(lanes.tokens[stack].cancelled)
+
+
+class StaleRequestTest(unittest.TestCase):
+    def test_stop_bound_request_from_before_a_resume_is_stale(self):
+        lanes = Lanes()
+        lanes.push("variables", {"variablesReference": 4})
+        lanes.lanes.resumed()
+        entry = lanes.lanes.pop()
+        self.assertTrue(lanes.lanes.is_stale(entry))
+
+    def test_stop_bound_request_from_the_current_stop_is_not_stale(self):
+        lanes = Lanes()
+        lanes.lanes.resumed()
+        lanes.push("scopes", {"frameId": 1})
+        self.assertFalse(lanes.lanes.is_stale(lanes.lanes.pop()))
+
+    def test_requests_that_dont_refer_to_ids_are_never_stale(self):
+        lanes = Lanes()
+        lanes.push("stackTrace", {"threadId": 1})
+        lanes.push("evaluate", {"expression": "x", "context": "watch"})
+        lanes.lanes.resumed()
+        self.assertFalse(lanes.lanes.is_stale(lanes.lanes.pop()))
+        self.assertFalse(lanes.lanes.is_stale(lanes.lanes.pop()))
+
+    def test_evaluate_in_a_frame_is_stop_bound(self):
+        lanes = Lanes()
+        lanes.push("evaluate", {"expression": "x", "context": "hover", "frameId": 3})
+        lanes.lanes.resumed()
+        self.assertTrue(lanes.lanes.is_stale(lanes.lanes.pop()))
+
+
+if __name__ == "__main__":
+    unittest.main()
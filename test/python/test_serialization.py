@@ -0,0 +1,120 @@
+"""Tests of the adapter's DAP message framing. serialization.py doesn't depend on GDB, so these run with plain
+Python:
+
+    python3 -m pytest test/python
+"""
+import json
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "modules", "python", "dap-wrapper"))
+
+from serialization import event, parse_one, response
+
+
+def frame(message):
+    """Frames `message` the way the extension does."""
+    payload = json.dumps(message, ensure_ascii=False).encode("utf-8")
+    return b"Content-Length: %d\r\n\r\n" % len(payload) + payload
+
+
+def parse_all(chunks):
+    """Feeds `chunks` to a buffer one at a time, like the adapter's reader does, and returns the parsed
+    messages."""
+    buffer = b""
+    messages = []
+    for chunk in chunks:
+        buffer += chunk
+        while True:
+            message, buffer = parse_one(buffer)
+            if message is None:
+                break
+            messages.append(message)
+    return messages, buffer
+
+
+def request(seq, command, arguments):
+    return {"seq": seq, "type": "request", "command": command, "arguments": arguments}
+
+
+class ParseTest(unittest.TestCase):
+    def test_non_ascii_payload(self):
+        message = request(1, "evaluate", {"expression": "ünïcødé → 𝔵", "context": "repl"})
+        data = frame(message)
+        self.assertEqual(parse_one(data), (message, b""))
+
+    def test_several_messages_in_one_buffer(self):
+        messages = [
+            request(1, "threads", {}),
+            request(2, "evaluate", {"expression": "ß", "context": "watch"}),
+            request(3, "stackTrace", {"threadId": 1}),
+        ]
+        self.assertEqual(parse_all([b"".join(frame(m) for m in messages)]), (messages, b""))
+
+    def test_header_split_across_buffers(self):
+        message = request(4, "setBreakpoints", {"source": {"path": "/tmp/ŝource.cpp"}, "breakpoints": []})
+        data = frame(message)
+        for split in (3, len(b"Content-Length: ") + 1, data.index(b"\r\n") + 1, data.index(b"{")):
+            self.assertEqual(parse_one(data[:split]), (None, data[:split]))
+            self.assertEqual(parse_all([data[:split], data[split:]]), ([message], b""), f"split at {split}")
+
+    def test_payload_split_across_buffers(self):
+        first = request(5, "scopes", {"frameId": 1})
+        second = request(6, "evaluate", {"expression": "één → twee", "context": "hover"})
+        data = frame(first) + frame(second)
+        # Split inside a multi-byte character of the second payload
+        split = data.index("→".encode("utf-8")) + 1
+        messages, remaining = parse_all([data[:split]])
+        self.assertEqual(messages, [first])
+        self.assertEqual(remaining, frame(second)[: split - len(frame(first))])
+        self.assertEqual(parse_all([data[:split], data[split:]]), ([first, second], b""))
+
+    def test_not_a_dap_message(self):
+        data = b"garbage\r\n\r\n{}"
+        self.assertEqual(parse_one(data), (None, data))
+
+
+class FramingTest(unittest.TestCase):
+    def test_response_round_trips(self):
+        body = {"result": "‘quoted’ ✓", "variablesReference": 0}
+        message, remaining = parse_one(response(10, 4, True, "evaluate", body=body))
+        self.assertEqual(remaining, b"")
+        self.assertEqual(
+            message,
+            {
+                "type": "response",
+                "seq": 10,
+                "request_seq": 4,
+                "success": True,
+                "command": "evaluate",
+                "message": None,
+                "body": body,
+            },
+        )
+
+    def test_failed_response_round_trips(self):
+        message, _ = parse_one(response(11, 5, False, "variables", message="cancelled"))
+        self.assertEqual(message["success"], False)
+        self.assertEqual(message["message"], "cancelled")
+        self.assertIsNone(message["body"])
+
+    def test_event_round_trips(self):
+        evt = {"type": "event", "event": "output", "body": {"category": "console", "output": "héllo\n"}}
+        message, remaining = parse_one(event(12, dict(evt)))
+        self.assertEqual(remaining, b"")
+        self.assertEqual(message, dict(evt, seq=12))
+
+    def test_content_length_counts_bytes(self):
+        data = event(13, {"type": "event", "event": "output", "body": {"output": "𝔵" * 10}})
+        header, payload = data.split(b"\r\n\r\n", 1)
+        self.assertEqual(header, b"Content-Length: %d" % len(payload))
+
+    def test_wide_integers(self):
+        # orjson refuses integers wider than 64 bits; they're serialized by the standard library instead
+        message, _ = parse_one(response(14, 6, True, "evaluate", body={"value": 2**70}))
+        self.assertEqual(message["body"], {"value": 2**70})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+const assert = require("assert");
+const { serializeRequest, processBuffer, parseBuffer } = require("../../modules/dap/dap-utils");
+
+/**
+ * What the communication channel holds after receiving `str`: the raw bytes, decoded as latin1.
+ * @param {string} str
+ */
+function received(str) {
+  return Buffer.from(str, "utf8").toString("latin1");
+}
+
+/**
+ * Frames `message` the way the adapter does.
+ * @param {object} message
+ */
+function frame(message) {
+  const payload = JSON.stringify(message);
+  return `Content-Length: ${Buffer.byteLength(payload, "utf8")}\r\n\r\n${payload}`;
+}
+
+/**
+ * Feeds `chunks` to a buffer one at a time, like the communication channel does, and returns the parsed messages.
+ * @param {string[]} chunks
+ */
+function receiveAll(chunks) {
+  let buffer = "";
+  const messages = [];
+  for (const chunk of chunks) {
+    buffer = buffer.concat(chunk);
+    const packets = processBuffer(buffer).filter((i) => i.all_received);
+    const { buffer: remaining, protocol_messages } = parseBuffer(buffer, packets);
+    buffer = remaining;
+    messages.push(...protocol_messages);
+  }
+  return { buffer, messages };
+}
+
+suite("DAP serialization", () => {
+  test("Content-Length of a request counts bytes", () => {
+    const serialized = serializeRequest(1, "evaluate", { expression: "ünïcødé → 𝔵" });
+    const [header, payload] = serialized.split("\r\n\r\n");
+    assert.strictEqual(header, `Content-Length: ${Buffer.byteLength(payload, "utf8")}`);
+    assert.notStrictEqual(Buffer.byteLength(payload, "utf8"), payload.length);
+    assert.deepStrictEqual(JSON.parse(payload), {
+      seq: 1,
+      type: "request",
+      command: "evaluate",
+      arguments: { expression: "ünïcødé → 𝔵" },
+    });
+  });
+
+  test("Request without arguments", () => {
+    const payload = serializeRequest(7, "threads").split("\r\n\r\n")[1];
+    assert.deepStrictEqual(JSON.parse(payload).arguments, {});
+  });
+
+  test("Parses a non-ASCII message", () => {
+    const message = { seq: 3, type: "event", event: "output", body: { output: "héllo wörld ✓ 𝔵\n" } };
+    const { buffer, messages } = receiveAll([received(frame(message))]);
+    assert.deepStrictEqual(messages, [message]);
+    assert.strictEqual(buffer, "");
+  });
+
+  test("Parses several messages received at once", () => {
+    const first = { seq: 1, type: "response", request_seq: 1, success: true, command: "threads", body: {} };
+    const second = { seq: 2, type: "event", event: "stopped", body: { reason: "breakpoint", description: "ß" } };
+    const third = { seq: 3, type: "event", event: "output", body: { output: "✓" } };
+    const { buffer, messages } = receiveAll([received(frame(first) + frame(second) + frame(third))]);
+    assert.deepStrictEqual(messages, [first, second, third]);
+    assert.strictEqual(buffer, "");
+  });
+
+  test("Keeps an incomplete message until the rest arrives", () => {
+    const first = { seq: 1, type: "event", event: "output", body: { output: "één" } };
+    const second = { seq: 2, type: "event", event: "output", body: { output: "twee → drie" } };
+    const bytes = received(frame(first) + frame(second));
+    const split = bytes.length - 5;
+    const partial = receiveAll([bytes.slice(0, split)]);
+    assert.deepStrictEqual(partial.messages, [first]);
+    assert.strictEqual(partial.buffer, received(frame(second)).slice(0, -5));
+    const all = receiveAll([bytes.slice(0, split), bytes.slice(split)]);
+    assert.deepStrictEqual(all.messages, [first, second]);
+    assert.strictEqual(all.buffer, "");
+  });
+
+  test("Parses a message whose header is split across chunks", () => {
+    const message = { seq: 9, type: "event", event: "output", body: { output: "ŝplit" } };
+    const bytes = received(frame(message));
+    for (const split of [3, "Content-Length: ".length + 1, bytes.indexOf("\r\n") + 1, bytes.indexOf("{")]) {
+      const { buffer, messages } = receiveAll([bytes.slice(0, split), bytes.slice(split)]);
+      assert.deepStrictEqual(messages, [message], `split at ${split}`);
+      assert.strictEqual(buffer, "");
+    }
+  });
+
+  test("Metadata of a partially received message", () => {
+    const bytes = received(frame({ seq: 1, type: "event", event: "initialized" }));
+    const [packet] = processBuffer(bytes.slice(0, -1));
+    assert.strictEqual(packet.all_received, false);
+    assert.strictEqual(packet.end, bytes.length);
+  });
+});
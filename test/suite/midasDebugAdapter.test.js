@@ -176,3 +176,123 @@ suite("Extension Breakpoints Test Suite", () => {
     });
   });
 });
+
+suite("Flattened Base Classes Test Suite", () => {
+  const PROGRAM = path.join(TEST_PROJECT, "build", "testapp");
+  const PORT = 44444;
+  let dc;
+
+  setup(async () => {
+    MidasDebugSession.run(PORT);
+
+    dc = new DebugClient("node", "we're running the adapter as a server and don't need an executable", "midas");
+
+    await dc.start(PORT);
+    return Promise.all([
+      dc.configurationSequence(),
+      dc.launch({ program: PROGRAM, stopOnEntry: true, flattenBaseClasses: true }),
+      dc.waitForEvent("stopped"),
+    ]);
+  });
+
+  teardown(() => {
+    dc.stop();
+  });
+
+  test("should display a virtual base shared by two paths once", async () => {
+    await dc.setFunctionBreakpointsRequest({ breakpoints: [{ name: "virtualbases::inspect" }] });
+    const [, stopped] = await Promise.all([dc.continueRequest({ threadId: 1 }), dc.waitForEvent("stopped")]);
+    const {
+      body: { stackFrames },
+    } = await dc.stackTraceRequest({ threadId: stopped.body.threadId });
+    const {
+      body: { scopes },
+    } = await dc.scopesRequest({ frameId: stackFrames[0].id });
+    const argsScope = scopes.find((scope) => scope.name == "Args");
+    const {
+      body: { variables: args },
+    } = await dc.variablesRequest({ variablesReference: argsScope.variablesReference });
+    const diamond = args.find((variable) => variable.name == "diamond");
+    const {
+      body: { variables: members },
+    } = await dc.variablesRequest({ variablesReference: diamond.variablesReference });
+
+    const names = members.map((member) => member.name);
+    assert.strictEqual(new Set(names).size, names.length, `every member should be listed once: ${names}`);
+    assert.deepStrictEqual(
+      names.filter((name) => name.endsWith("side_value")).sort(),
+      ["Left::side_value", "Right::side_value"],
+    );
+    const shared = members.filter((member) => member.name.endsWith("shared_value"));
+    assert.strictEqual(shared.length, 1, "the virtual base should be displayed once");
+    assert.strictEqual(shared[0].name, "shared_value");
+    assert.strictEqual(shared[0].value, "10");
+  }).timeout("10s");
+});
+
+suite("Lazy Strings Test Suite", () => {
+  const PROGRAM = path.join(TEST_PROJECT, "build", "testapp");
+  const PORT = 44444;
+  let dc;
+
+  setup(async () => {
+    MidasDebugSession.run(PORT);
+
+    dc = new DebugClient("node", "we're running the adapter as a server and don't need an executable", "midas");
+
+    await dc.start(PORT);
+    return Promise.all([
+      dc.configurationSequence(),
+      dc.launch({ program: PROGRAM, stopOnEntry: true, lazyStringPrefix: 16 }),
+      dc.waitForEvent("stopped"),
+    ]);
+  });
+
+  teardown(() => {
+    dc.stop();
+  });
+
+  test("should page in a lazy string when expanded with an indexed filter", async () => {
+    await dc.setFunctionBreakpointsRequest({ breakpoints: [{ name: "lazystrings::inspect" }] });
+    const [, stopped] = await Promise.all([dc.continueRequest({ threadId: 1 }), dc.waitForEvent("stopped")]);
+    const {
+      body: { stackFrames },
+    } = await dc.stackTraceRequest({ threadId: stopped.body.threadId });
+    const {
+      body: { scopes },
+    } = await dc.scopesRequest({ frameId: stackFrames[0].id });
+    const argsScope = scopes.find((scope) => scope.name == "Args");
+    const {
+      body: { variables: args },
+    } = await dc.variablesRequest({ variablesReference: argsScope.variablesReference });
+    const text = args.find((variable) => variable.name == "text");
+    const {
+      body: { variables: contents },
+    } = await dc.variablesRequest({ variablesReference: text.variablesReference });
+    const lazy = contents.find((variable) => variable.indexedVariables !== undefined);
+    assert(lazy !== undefined, "the string should be displayed as a lazy string");
+    assert(lazy.value.endsWith("…"), "only a prefix of the string should be displayed");
+    assert.strictEqual(lazy.indexedVariables, 3);
+
+    // What VS Code sends when a row with indexedVariables is expanded
+    const {
+      body: { variables: named },
+    } = await dc.variablesRequest({ variablesReference: lazy.variablesReference, filter: "named" });
+    assert.deepStrictEqual(named, []);
+    const {
+      body: { variables: pages },
+    } = await dc.variablesRequest({
+      variablesReference: lazy.variablesReference,
+      filter: "indexed",
+      start: 0,
+      count: 3,
+    });
+    // The two byte character at the end of the first page is kept whole, on the first page
+    assert.deepStrictEqual(
+      pages.map((page) => page.name),
+      ["[0]", "[4097]", "[8192]"],
+    );
+    const string = pages.map((page) => JSON.parse(page.value)).join("");
+    assert.strictEqual(string, "a".repeat(4095) + "é" + "b".repeat(5000));
+  }).timeout("10s");
+});